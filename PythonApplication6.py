@@ -1,4 +1,20 @@
-﻿class ExpiryDialog(QDialog):
+﻿import json
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from PyQt5.QtCore import (QAbstractTableModel, QEvent, QModelIndex, QObject, Qt,
+                          QTimer, pyqtSignal)
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import (QCheckBox, QComboBox, QDialog, QFileDialog, QFrame,
+                             QGridLayout, QHBoxLayout, QLabel, QLineEdit,
+                             QListWidget, QMessageBox, QProgressBar,
+                             QPushButton, QSpinBox, QTableWidget,
+                             QTableWidgetItem, QVBoxLayout)
+
+from instrumentation import metrics
+
+
+class ExpiryDialog(QDialog):
     """Simple dialog to show expiring items"""
     
     def __init__(self, parent, logger, expiring_items):
@@ -141,6 +157,11 @@ class StartupExpiryDialog(QDialog):
         suggest_btn.clicked.connect(self.suggest_recipes)
         btn_layout.addWidget(suggest_btn)
         
+        plan_btn = QPushButton("Plan Meals")
+        plan_btn.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
+        plan_btn.clicked.connect(self.plan_meals)
+        btn_layout.addWidget(plan_btn)
+        
         close_btn = QPushButton("Dismiss")
         close_btn.clicked.connect(self.reject)
         btn_layout.addWidget(close_btn)
@@ -163,6 +184,10 @@ class StartupExpiryDialog(QDialog):
     def suggest_recipes(self):
         self.logger.suggest_recipes([name for name, _ in self.expiring_items])
         self.accept()
+    
+    def plan_meals(self):
+        self.accept()
+        self.logger.show_meal_plan()
 
 class RecipeDialog(QDialog):
     """Dialog to display recipe suggestions"""
@@ -228,17 +253,12 @@ class RecipeSelectionDialog(QDialog):
         self.recipe_table.setSelectionMode(QTableWidget.SingleSelection)
         self.recipe_table.setEditTriggers(QTableWidget.NoEditTriggers)
         self.recipe_table.setAlternatingRowColors(True)
-        
-        self.recipe_table.setRowCount(len(self.matching_recipes))
-        for row, match_data in enumerate(self.matching_recipes):
-            recipe = match_data['recipe']
-            self.recipe_table.setItem(row, 0, QTableWidgetItem(recipe['name']))
-            self.recipe_table.setItem(row, 1, QTableWidgetItem(f"{int(match_data['match_percentage'])}%"))
-            self.recipe_table.setItem(row, 2, QTableWidgetItem(", ".join(match_data['matched_ingredients'])))
-        
-        self.recipe_table.resizeColumnsToContents()
         layout.addWidget(self.recipe_table)
         
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.set_matches(self.matching_recipes)
+        
         btn_layout = QHBoxLayout()
         
         cancel_btn = QPushButton("Cancel")
@@ -253,6 +273,30 @@ class RecipeSelectionDialog(QDialog):
         layout.addLayout(btn_layout)
         self.setLayout(layout)
         
+    def set_matches(self, matching_recipes, limit=200):
+        """Show a new ranking, e.g. one improved by fuzzy matching, keeping the selected recipe"""
+        selected_rows = self.recipe_table.selectionModel().selectedRows()
+        selected = self.matching_recipes[selected_rows[0].row()]['recipe'] if selected_rows else None
+        
+        self.matching_recipes = matching_recipes[:limit]
+        self.recipe_table.setRowCount(len(self.matching_recipes))
+        for row, match_data in enumerate(self.matching_recipes):
+            recipe = match_data['recipe']
+            self.recipe_table.setItem(row, 0, QTableWidgetItem(recipe['name']))
+            self.recipe_table.setItem(row, 1, QTableWidgetItem(f"{int(match_data['match_percentage'])}%"))
+            self.recipe_table.setItem(row, 2, QTableWidgetItem(", ".join(match_data['matched_ingredients'])))
+            if recipe is selected:
+                self.recipe_table.selectRow(row)
+        self.recipe_table.resizeColumnsToContents()
+        
+    def set_searching(self, searching):
+        if searching:
+            self.status_label.setText("Looking for close matches...")
+        elif self.matching_recipes:
+            self.status_label.setText(f"{len(self.matching_recipes)} recipe(s) found.")
+        else:
+            self.status_label.setText("No recipes found for these ingredients.")
+        
     def view_selected_recipe(self):
         selected_rows = self.recipe_table.selectionModel().selectedRows()
         if selected_rows:
@@ -260,4 +304,672 @@ class RecipeSelectionDialog(QDialog):
             self.selected_recipe = self.matching_recipes[row]['recipe']
             self.accept()
         else:
-            QMessageBox.information(self, "Selection Required", "Please select a recipe to view.") 
\ No newline at end of file
+            QMessageBox.information(self, "Selection Required", "Please select a recipe to view.")
+
+class MealPlanDialog(QDialog):
+    """Meals for the next few days chosen to use up what expires soonest"""
+    
+    def __init__(self, parent, logger):
+        super().__init__(parent)
+        self.logger = logger
+        self.plan = []
+        self.setWindowTitle("Meal Plan")
+        self.setMinimumSize(600, 350)
+        self.setup_ui()
+        self.replan()
+        
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(QLabel("Days:"))
+        self.days_spin = QSpinBox()
+        self.days_spin.setRange(1, 14)
+        self.days_spin.setValue(3)
+        options_layout.addWidget(self.days_spin)
+        options_layout.addWidget(QLabel("Meals per day:"))
+        self.meals_spin = QSpinBox()
+        self.meals_spin.setRange(1, 5)
+        options_layout.addWidget(self.meals_spin)
+        replan_btn = QPushButton("Replan")
+        replan_btn.clicked.connect(self.replan)
+        options_layout.addWidget(replan_btn)
+        options_layout.addStretch()
+        layout.addLayout(options_layout)
+        
+        self.plan_table = QTableWidget(0, 4)
+        self.plan_table.setHorizontalHeaderLabels(["Day", "Recipe", "Uses Up", "Quantity"])
+        self.plan_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.plan_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.plan_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.plan_table.doubleClicked.connect(self.view_selected_recipe)
+        layout.addWidget(self.plan_table)
+        
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        
+        btn_layout = QHBoxLayout()
+        
+        view_btn = QPushButton("View Recipe")
+        view_btn.clicked.connect(self.view_selected_recipe)
+        btn_layout.addWidget(view_btn)
+        
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        btn_layout.addWidget(close_btn)
+        
+        layout.addLayout(btn_layout)
+        self.setLayout(layout)
+        
+    def replan(self):
+        self.plan = self.logger.plan_meals(self.days_spin.value(), self.meals_spin.value())
+        today = datetime.now().date()
+        self.plan_table.setRowCount(len(self.plan))
+        for row, meal in enumerate(self.plan):
+            day = today + timedelta(days=meal['day'])
+            day_text = "Today" if meal['day'] == 0 else day.strftime('%a %Y-%m-%d')
+            self.plan_table.setItem(row, 0, QTableWidgetItem(day_text))
+            self.plan_table.setItem(row, 1, QTableWidgetItem(meal['recipe']['name']))
+            self.plan_table.setItem(row, 2, QTableWidgetItem(", ".join(meal['uses'])))
+            self.plan_table.setItem(row, 3, QTableWidgetItem(str(meal['quantity'])))
+        self.plan_table.resizeColumnsToContents()
+        
+        if self.plan:
+            used = sum(meal['quantity'] for meal in self.plan)
+            self.summary_label.setText(f"{len(self.plan)} meal(s) using up {used} of the food expiring soon.")
+        else:
+            self.summary_label.setText("No recipe uses any of the food expiring soon.")
+        
+    def view_selected_recipe(self):
+        selected_rows = self.plan_table.selectionModel().selectedRows()
+        if not selected_rows:
+            QMessageBox.information(self, "Selection Required", "Please select a meal to view its recipe.")
+            return
+        recipe = self.logger.recipe_store.full_recipe(self.plan[selected_rows[0].row()]['recipe'])
+        RecipeDialog(self, recipe).exec_()
+
+class ReportDialog(QDialog):
+    """Waste summary and purchased items of a report from InventoryCore.compute_report"""
+    
+    def __init__(self, parent, report_data, report_type="weekly"):
+        super().__init__(parent)
+        self.report_data = report_data
+        self.setWindowTitle(f"{report_type.capitalize()} Report")
+        self.setMinimumSize(600, 400)
+        self.setup_ui()
+        
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        report = self.report_data
+        
+        title_label = QLabel(f"Food Waste Report: {report['start_date']} to {report['end_date']}")
+        title_label.setStyleSheet("font-weight: bold; font-size: 16px;")
+        layout.addWidget(title_label)
+        
+        summary_layout = QGridLayout()
+        summary = [("Total items:", report['total_items']),
+                   ("Consumed:", report['consumed_items']),
+                   ("Expired or wasted:", report['expired_items']),
+                   ("Waste:", f"{report['waste_percentage']:.1f}%")]
+        for row, (label, value) in enumerate(summary):
+            summary_layout.addWidget(QLabel(label), row, 0)
+            summary_layout.addWidget(QLabel(str(value)), row, 1)
+        layout.addLayout(summary_layout)
+        
+        items = report['items']
+        items_label = QLabel(f"Items purchased in this period ({len(items)}):")
+        items_label.setStyleSheet("font-weight: bold;")
+        layout.addWidget(items_label)
+        
+        table = QTableWidget(len(items), 5)
+        table.setHorizontalHeaderLabels(["Name", "Category", "Status", "Purchase Date", "Expiry Date"])
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setAlternatingRowColors(True)
+        expired_color = QColor(255, 200, 200)
+        for row, item in enumerate(items):
+            for column, key in enumerate(("name", "category", "status", "purchase_date", "expiry_date")):
+                cell = QTableWidgetItem(item[key])
+                if item['status'] == "Expired":
+                    cell.setBackground(expired_color)
+                table.setItem(row, column, cell)
+        table.resizeColumnsToContents()
+        layout.addWidget(table)
+        
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        layout.addWidget(close_btn)
+        
+        self.setLayout(layout)
+
+class FoodTableModel(QAbstractTableModel):
+    """Table model that reads inventory rows lazily from the logger's item store"""
+    
+    headers = ["Name", "Category", "Quantity", "Purchase Date", "Expiry Date", "Days Left"]
+    reset_threshold = 500  # Above this many changed items a full reset is cheaper
+    
+    def __init__(self, logger):
+        super().__init__()
+        self.logger = logger
+        self.item_ids = []    # Row order
+        self.row_keys = []    # Sort key of each row, kept parallel to item_ids
+        self.keys = {}        # item_id -> sort key
+        self.query = ""       # Only items matching this search are shown
+        self.today = datetime.now().date()
+        self.colors = {
+            0: QColor(255, 255, 200),  # Light yellow for expiring soon
+            1: QColor(255, 200, 200),  # Light red for expired
+            2: QColor(200, 255, 200)   # Light green for non-expiring items
+        }
+        
+    def sort_key(self, item_id):
+        item_data = self.logger.food_items[item_id]
+        days_left = item_data.expiry_ordinal - self.today.toordinal()
+        # The expiry date orders rows like days left does, but stays valid when the day changes
+        return (self.logger.sort_priority(days_left, item_data.category), item_data.expiry_ordinal, item_id)
+        
+    def reload(self, today=None):
+        """Rebuild every row, e.g. after loading data"""
+        self.beginResetModel()
+        self.today = today or datetime.now().date()
+        if self.query:
+            # Only the matches need sort keys, however big the inventory is
+            self.keys = {item_id: self.sort_key(item_id) for item_id in self.logger.search_items(self.query)}
+            self.item_ids = sorted(self.keys, key=self.keys.get)
+        else:
+            self.item_ids = self.logger.sorted_item_ids(self.today)
+            self.keys = {item_id: self.sort_key(item_id) for item_id in self.item_ids}
+        self.row_keys = [self.keys[item_id] for item_id in self.item_ids]
+        self.endResetModel()
+        
+    def set_filter(self, query):
+        """Show only the items whose name or category match query, or every item if it is blank"""
+        query = query.strip()
+        if query != self.query:
+            self.query = query
+            self.reload(self.today)
+        
+    def matches(self, item_id):
+        return not self.query or self.logger.search_index.matches(item_id, self.query)
+        
+    def has_row(self, item_id):
+        return item_id in self.logger.food_items and self.matches(item_id)
+        
+    def update_items(self, item_ids):
+        """Move, insert or remove the rows of items that were added or removed"""
+        if len(item_ids) > self.reset_threshold:
+            self.reload()
+            return
+        
+        for item_id in item_ids:
+            old_key = self.keys.pop(item_id, None)
+            if old_key is not None:
+                row = bisect_left(self.row_keys, old_key)
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.item_ids[row]
+                del self.row_keys[row]
+                self.endRemoveRows()
+            
+            if self.has_row(item_id):
+                key = self.sort_key(item_id)
+                row = bisect_left(self.row_keys, key)
+                self.beginInsertRows(QModelIndex(), row, row)
+                self.item_ids.insert(row, item_id)
+                self.row_keys.insert(row, key)
+                self.keys[item_id] = key
+                self.endInsertRows()
+                
+    def advance_day(self, today):
+        """Move the table to a new day, returning the ids of items that started expiring soon
+        
+        Every Days Left value changes, but only rows whose status changed
+        have to move; the logger finds those from its expiry index.
+        """
+        if today < self.today:
+            # The clock went back, nothing to be clever about
+            self.reload(today)
+            return []
+        
+        since, self.today = self.today, today
+        expiring, expired = self.logger.status_changes(since, today)
+        changed = [item_id for item_id in dict.fromkeys(expiring + expired) if item_id in self.keys]
+        if len(changed) > self.reset_threshold:
+            self.reload(today)
+        else:
+            self.update_items(changed)
+            if self.item_ids:
+                days_column = len(self.headers) - 1
+                self.dataChanged.emit(self.index(0, days_column), self.index(len(self.item_ids) - 1, days_column),
+                                      [Qt.DisplayRole])
+        return expiring
+        
+    def item_id_at(self, row):
+        return self.item_ids[row]
+        
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.item_ids)
+        
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+        
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+        
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        item_id = self.item_ids[index.row()]
+        item_data = self.logger.food_items.get(item_id)
+        if item_data is None:
+            return None
+        
+        if role == Qt.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return item_data['name']
+            elif column == 1:
+                return item_data['category']
+            elif column == 2:
+                return str(item_data['quantity'])
+            elif column == 3:
+                return item_data['purchase_date'].strftime('%Y-%m-%d')
+            elif column == 4:
+                return item_data['expiry_date'].strftime('%Y-%m-%d')
+            return f"{(item_data['expiry_date'] - self.today).days} days"
+        elif role == Qt.BackgroundRole:
+            return self.colors[self.keys[item_id][0]]
+        elif role == Qt.UserRole:
+            return item_id
+        return None
+
+class ProductTableModel(FoodTableModel):
+    """Table model with one row per (name, category) product, summing up its lots
+    
+    Rows are keyed by product instead of item id and ordered by each
+    product's earliest expiring lot; the lots themselves are only listed
+    when a product is opened in a LotsDialog.
+    """
+    
+    headers = ["Name", "Category", "Quantity", "Lots", "Next Expiry", "Days Left"]
+    
+    def __init__(self, logger):
+        super().__init__(logger)
+        self.item_products = {}  # item_id -> product, so removed lots still find their row
+        
+    def first_lot(self, product):
+        return self.logger.food_items[self.logger.product_index.lots[product][0][1]]
+        
+    def sort_key(self, product):
+        lot = self.first_lot(product)
+        days_left = lot.expiry_ordinal - self.today.toordinal()
+        return (self.logger.sort_priority(days_left, lot.category), lot.expiry_ordinal, product)
+        
+    def reload(self, today=None):
+        """Rebuild every row from the product index"""
+        self.beginResetModel()
+        self.today = today or datetime.now().date()
+        products = self.logger.product_index.lots
+        if self.query:
+            products = {self.logger.product_index.product_of(item_id)
+                        for item_id in self.logger.search_items(self.query)}
+        self.keys = {product: self.sort_key(product) for product in products}
+        self.item_products = {item_id: product for product in self.keys
+                              for _, item_id in self.logger.product_index.lots[product]}
+        self.item_ids = sorted(self.keys, key=self.keys.get)
+        self.row_keys = [self.keys[product] for product in self.item_ids]
+        self.endResetModel()
+        
+    def matches(self, product):
+        if not self.query:
+            return True
+        # Every lot of a product has the same name and category, so the first one decides
+        return self.logger.search_index.matches(self.logger.product_index.lots[product][0][1], self.query)
+        
+    def has_row(self, product):
+        return product in self.logger.product_index.lots and self.matches(product)
+        
+    def update_items(self, item_ids):
+        """Move, insert or remove the rows of the products whose lots changed"""
+        products = set()
+        for item_id in item_ids:
+            # Removed lots are gone from the inventory, but their product is still known
+            product = self.item_products.pop(item_id, None)
+            if product is not None:
+                products.add(product)
+            item_data = self.logger.food_items.get(item_id)
+            if item_data is not None:
+                product = (item_data.name, item_data.category)
+                self.item_products[item_id] = product
+                products.add(product)
+        super().update_items(list(products))
+        
+    def advance_day(self, today):
+        """Move the table to a new day; there are few enough products to simply reload"""
+        self.reload(today)
+        return []
+        
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        product = self.item_ids[index.row()]
+        if product not in self.logger.product_index.lots:
+            return None
+        
+        if role == Qt.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return product[0]
+            elif column == 1:
+                return product[1]
+            elif column == 2:
+                return str(self.logger.product_index.totals[product])
+            elif column == 3:
+                return str(len(self.logger.product_index.lots[product]))
+            lot = self.first_lot(product)
+            if column == 4:
+                return lot.expiry_date.strftime('%Y-%m-%d')
+            return f"{lot.expiry_ordinal - self.today.toordinal()} days"
+        elif role == Qt.BackgroundRole:
+            return self.colors[self.keys[product][0]]
+        elif role == Qt.UserRole:
+            return product
+        return None
+
+class LotsDialog(QDialog):
+    """The dated lots of one product, in the order they will be used up"""
+    
+    def __init__(self, parent, logger, product):
+        super().__init__(parent)
+        self.logger = logger
+        self.product = product
+        self.setWindowTitle(f"Lots of {product[0]}")
+        self.setMinimumSize(450, 300)
+        self.setup_ui()
+        
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        
+        title_label = QLabel(f"{self.product[0]} ({self.product[1]}), earliest expiry first:")
+        title_label.setStyleSheet("font-weight: bold;")
+        layout.addWidget(title_label)
+        
+        lot_ids = self.logger.product_lots(*self.product)
+        today = datetime.now().date()
+        table = QTableWidget(len(lot_ids), 4)
+        table.setHorizontalHeaderLabels(["Purchase Date", "Expiry Date", "Quantity", "Days Left"])
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        for row, item_id in enumerate(lot_ids):
+            lot = self.logger.food_items[item_id]
+            table.setItem(row, 0, QTableWidgetItem(lot.purchase_date.strftime('%Y-%m-%d')))
+            table.setItem(row, 1, QTableWidgetItem(lot.expiry_date.strftime('%Y-%m-%d')))
+            table.setItem(row, 2, QTableWidgetItem(str(lot.quantity)))
+            table.setItem(row, 3, QTableWidgetItem(f"{(lot.expiry_date - today).days} days"))
+        table.resizeColumnsToContents()
+        layout.addWidget(table)
+        
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        layout.addWidget(close_btn)
+        
+        self.setLayout(layout)
+
+class MetricsDialog(QDialog):
+    """Per-operation call counts, latencies and bytes written this session"""
+    
+    columns = [("calls", "Calls"), ("errors", "Errors"), ("mean_ms", "Mean ms"), ("p50_ms", "p50 ms"),
+               ("p99_ms", "p99 ms"), ("max_ms", "Max ms"), ("bytes_written", "Bytes Written")]
+    
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.setMinimumSize(750, 350)
+        self.setup_ui()
+        self.refresh()
+        
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        
+        self.since_label = QLabel()
+        layout.addWidget(self.since_label)
+        
+        self.table = QTableWidget(0, len(self.columns) + 1)
+        self.table.setHorizontalHeaderLabels(["Operation"] + [title for _, title in self.columns])
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+        
+        btn_layout = QHBoxLayout()
+        
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.refresh)
+        btn_layout.addWidget(refresh_btn)
+        
+        save_btn = QPushButton("Save JSON...")
+        save_btn.clicked.connect(self.save_json)
+        btn_layout.addWidget(save_btn)
+        
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.reset)
+        btn_layout.addWidget(reset_btn)
+        
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        btn_layout.addWidget(close_btn)
+        
+        layout.addLayout(btn_layout)
+        self.setLayout(layout)
+        
+    def refresh(self):
+        snapshot = metrics.snapshot()
+        self.since_label.setText(f"Measured since {snapshot['since']}")
+        self.table.setRowCount(len(snapshot['operations']))
+        for row, (name, stats) in enumerate(snapshot['operations'].items()):
+            self.table.setItem(row, 0, QTableWidgetItem(name))
+            for column, (key, _) in enumerate(self.columns, 1):
+                value = stats[key]
+                text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        self.table.resizeColumnsToContents()
+        
+    def save_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Diagnostics", "metrics.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, 'w') as file:
+                json.dump(metrics.snapshot(), file, indent=2)
+        except Exception as e:
+            QMessageBox.critical(self, "Save Error", f"Could not save diagnostics: {e}")
+            
+    def reset(self):
+        metrics.reset()
+        self.refresh()
+
+class ScanDialog(QDialog):
+    """Add items by barcode from the product catalog, one at a time or as a continuous run
+    
+    A single scan fills in the form so the item can be checked before adding;
+    unknown barcodes are saved to the catalog once described. In continuous
+    mode scans only queue up, and the run is added as one batch once the
+    scanner has been idle for commit_delay milliseconds or the dialog closes.
+    """
+    
+    commit_delay = 500
+    
+    def __init__(self, parent, logger):
+        super().__init__(parent)
+        self.logger = logger
+        self.pending = []  # Barcodes scanned in continuous mode and not added yet
+        self.commit_timer = QTimer(self)
+        self.commit_timer.setSingleShot(True)
+        self.commit_timer.timeout.connect(self.commit_pending)
+        self.setWindowTitle("Scan Product")
+        self.setMinimumWidth(400)
+        self.setup_ui()
+        
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        
+        self.barcode_entry = QLineEdit()
+        self.barcode_entry.setPlaceholderText("Scan or type a barcode")
+        self.barcode_entry.returnPressed.connect(self.barcode_scanned)
+        layout.addWidget(self.barcode_entry)
+        
+        self.continuous_check = QCheckBox("Continuous scanning (add every scan)")
+        self.continuous_check.toggled.connect(self.mode_changed)
+        layout.addWidget(self.continuous_check)
+        
+        # Single scan: the product, editable before it is added
+        self.form = QFrame()
+        form_layout = QGridLayout(self.form)
+        form_layout.addWidget(QLabel("Name:"), 0, 0)
+        self.name_entry = QLineEdit()
+        form_layout.addWidget(self.name_entry, 0, 1)
+        form_layout.addWidget(QLabel("Category:"), 1, 0)
+        self.category_dropdown = QComboBox()
+        self.category_dropdown.addItems(list(self.logger.food_categories.keys()))
+        form_layout.addWidget(self.category_dropdown, 1, 1)
+        form_layout.addWidget(QLabel("Shelf Life (days):"), 2, 0)
+        self.shelf_life_spin = QSpinBox()
+        self.shelf_life_spin.setRange(0, 3650)
+        form_layout.addWidget(self.shelf_life_spin, 2, 1)
+        form_layout.addWidget(QLabel("Quantity:"), 3, 0)
+        self.quantity_spin = QSpinBox()
+        self.quantity_spin.setRange(1, 999)
+        form_layout.addWidget(self.quantity_spin, 3, 1)
+        self.remember_check = QCheckBox("Save to product catalog")
+        form_layout.addWidget(self.remember_check, 4, 1)
+        layout.addWidget(self.form)
+        
+        # Continuous scanning: the run so far
+        self.pending_list = QListWidget()
+        self.pending_list.hide()
+        layout.addWidget(self.pending_list)
+        
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+        
+        btn_layout = QHBoxLayout()
+        
+        self.add_btn = QPushButton("Add Item")
+        self.add_btn.setStyleSheet("background-color: #007BFF; color: white;")
+        self.add_btn.setEnabled(False)
+        self.add_btn.clicked.connect(self.add_scanned)
+        btn_layout.addWidget(self.add_btn)
+        
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.reject)
+        # The scanner ends every code with Enter, which must not press a button
+        for button in (self.add_btn, close_btn):
+            button.setAutoDefault(False)
+        btn_layout.addWidget(close_btn)
+        
+        layout.addLayout(btn_layout)
+        self.setLayout(layout)
+        self.barcode_entry.setFocus()
+        
+    def mode_changed(self, continuous):
+        self.commit_pending()
+        self.form.setVisible(not continuous)
+        self.add_btn.setVisible(not continuous)
+        self.pending_list.setVisible(continuous)
+        self.status_label.clear()
+        self.barcode_entry.setFocus()
+        
+    def barcode_scanned(self):
+        barcode = self.barcode_entry.text().strip()
+        self.barcode_entry.clear()
+        if not barcode:
+            return
+        if self.continuous_check.isChecked():
+            # Only queue here so a burst of scans never waits on a save or a table refresh
+            self.pending.append(barcode)
+            product = self.logger.catalog.lookup(barcode)
+            self.pending_list.addItem(product.name if product else f"{barcode} (unknown)")
+            self.pending_list.scrollToBottom()
+            self.commit_timer.start(self.commit_delay)
+        else:
+            self.show_product(barcode)
+        
+    def show_product(self, barcode):
+        """Fill the form from the catalog, or leave it to be described for an unknown barcode"""
+        self.barcode = barcode
+        product = self.logger.catalog.lookup(barcode)
+        self.quantity_spin.setValue(1)
+        self.remember_check.setChecked(product is None)
+        if product is None:
+            self.status_label.setText(f"Barcode {barcode} is not in the catalog. Describe the product to add it.")
+            self.name_entry.clear()
+            self.shelf_life_spin.setValue(self.logger.food_categories.get(self.category_dropdown.currentText(), 7))
+            self.name_entry.setFocus()
+        else:
+            self.status_label.setText(f"Barcode {barcode}")
+            self.name_entry.setText(product.name)
+            self.category_dropdown.setCurrentText(product.category)
+            self.shelf_life_spin.setValue(product.shelf_life_days if product.shelf_life_days is not None
+                                          else self.logger.food_categories.get(product.category, 7))
+        self.add_btn.setEnabled(True)
+        
+    def add_scanned(self):
+        name = self.name_entry.text().strip()
+        if not name:
+            QMessageBox.critical(self, "Input Error", "Item name is required.")
+            return
+        category = self.category_dropdown.currentText()
+        shelf_life = self.shelf_life_spin.value()
+        if self.remember_check.isChecked():
+            self.logger.catalog.add_product(self.barcode, name, category, shelf_life)
+        
+        purchase_date = datetime.now().date()
+        self.logger.add_food_item(name, category, float(self.quantity_spin.value()), purchase_date,
+                                  purchase_date + timedelta(days=shelf_life))
+        self.status_label.setText(f"Added {name} to inventory.")
+        self.add_btn.setEnabled(False)
+        self.barcode_entry.setFocus()
+        
+    def commit_pending(self):
+        """Add the queued scans as one batch"""
+        self.commit_timer.stop()
+        if not self.pending:
+            return
+        barcodes, self.pending = self.pending, []
+        item_ids, unknown = self.logger.add_scanned_items(barcodes)
+        self.pending_list.clear()
+        scans = sum(1 for barcode in barcodes if barcode not in unknown)
+        message = f"Added {scans} scan(s) as {len(item_ids)} item(s)."
+        if unknown:
+            message += f" Not in the catalog: {', '.join(unknown)}"
+        self.status_label.setText(message)
+        
+    def done(self, result):
+        # Closing the dialog must not lose a run still waiting for the scanner to go idle
+        self.commit_pending()
+        super().done(result)
+
+class LoggerSignals(QObject):
+    """Signals that carry events from worker threads to the GUI thread"""
+    
+    save_failed = pyqtSignal(str)
+    inventory_loaded = pyqtSignal(object)
+    recipe_matches = pyqtSignal(object, object)  # (dialog, ranking or None once finished)
+
+class FirstPaintWatcher(QObject):
+    """Application event filter that reports the first paint, then removes itself"""
+    
+    def __init__(self, app, on_first_paint):
+        super().__init__()
+        self.app = app
+        self.on_first_paint = on_first_paint
+        app.installEventFilter(self)
+    
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.on_first_paint is not None:
+            callback, self.on_first_paint = self.on_first_paint, None
+            self.app.removeEventFilter(self)
+            callback()
+        return False
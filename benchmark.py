@@ -0,0 +1,202 @@
+"""Reproducible timings for the Food Waste Logger hot paths
+
+Builds synthetic inventories and recipe libraries of each requested size in
+a temporary directory, times every hot path headlessly and prints the
+results as JSON so runs can be compared.
+
+    python benchmark.py --sizes 1000 10000 --repeat 20 --output before.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from inventory_core import InventoryCore
+
+CATEGORIES = ["Dairy", "Meat", "Vegetables", "Fruits", "Bakery", "Pantry"]
+FOODS = ["Milk", "Eggs", "Cheese", "Yogurt", "Butter", "Chicken", "Beef", "Pork", "Carrot",
+         "Broccoli", "Spinach", "Tomato", "Potato", "Onion", "Banana", "Apple", "Orange",
+         "Bread", "Bagel", "Rice", "Pasta", "Flour", "Beans", "Lentils"]
+VARIETIES = ["", "Organic ", "Fresh ", "Frozen ", "Whole ", "Cherry ", "Smoked ", "Red "]
+
+qt_app = None  # Kept alive for the table model benchmarks
+
+
+def make_inventory(size, rng):
+    """Return add_food_item arguments for size synthetic items"""
+    today = datetime.now().date()
+    items = []
+    for i in range(size):
+        purchase_date = today - timedelta(days=rng.randint(0, 60))
+        items.append({
+            "name": f"{rng.choice(VARIETIES)}{rng.choice(FOODS)} {i % 97}",
+            "category": rng.choice(CATEGORIES),
+            "quantity": float(rng.randint(1, 10)),
+            "purchase_date": purchase_date,
+            "expiry_date": purchase_date + timedelta(days=rng.randint(1, 60))
+        })
+    return items
+
+
+def make_recipes(size, rng):
+    """Return size synthetic recipes"""
+    return [{
+        "name": f"Recipe {i}",
+        "ingredients": [f"{rng.choice(VARIETIES)}{food}" for food in rng.sample(FOODS, rng.randint(2, 6))],
+        "instructions": "1. Combine everything.\n2. Cook until done."
+    } for i in range(size)]
+
+
+def time_calls(func, repeat):
+    """Call func repeat times and summarize the latencies, plus the peak memory of one call"""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        "calls": repeat,
+        "throughput_per_s": repeat / total if total else None,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "peak_memory_kib": peak / 1024
+    }
+
+
+def table_model_class():
+    """Return FoodTableModel on the offscreen Qt platform, or None without PyQt5"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtWidgets import QApplication
+        from PythonApplication6 import FoodTableModel
+    except ImportError:
+        return None
+
+    global qt_app
+    qt_app = QApplication.instance() or QApplication([])
+    return FoodTableModel
+
+
+def time_startup(storage_mode, app_dir):
+    """Open the full window on an existing inventory and report its startup milestones"""
+    if table_model_class() is None:
+        return {"skipped": "PyQt5 is not installed"}
+    from python_group import FoodWasteLogger
+
+    logger = FoodWasteLogger(storage_mode, app_dir)
+    while not logger.loaded:
+        qt_app.processEvents()
+        time.sleep(0.001)
+    timings = dict(logger.startup_timings)
+    logger.window.close()
+    logger.close()
+    return timings
+
+
+def bench_size(size, repeat, storage_mode, seed):
+    """Time every hot path against an inventory of the given size"""
+    rng = random.Random(seed)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as app_dir:
+        with open(os.path.join(app_dir, "recipes.jsonl"), 'w') as file:
+            for recipe in make_recipes(size, rng):
+                file.write(json.dumps(recipe) + '\n')
+
+        core = InventoryCore(storage_mode, app_dir)
+        core.add_food_items(make_inventory(size, rng))
+        results["items"] = len(core.food_items)
+        results["recipes"] = len(core.recipes)
+        extra_items = iter(make_inventory(repeat * 2 + 1, rng))
+
+        def save_data():
+            core.save_data()
+            core.persistence.flush()
+        results["save_data"] = time_calls(save_data, repeat)
+        results["load_data"] = time_calls(core.load_data, repeat)
+        results["add_food_item"] = time_calls(lambda: core.add_food_item(**next(extra_items)), repeat)
+        results["get_expiring_soon"] = time_calls(core.get_expiring_soon, repeat)
+
+        def clear_recipe_caches():
+            core.recipe_matches.clear()
+            core.fuzzy_matches.clear()
+
+        def suggest_recipes():
+            # What Suggest Recipe waits for before its dialog opens
+            clear_recipe_caches()
+            next(core.fuzzy_recipe_matches())
+        results["suggest_recipes"] = time_calls(suggest_recipes, repeat)
+
+        def suggest_recipes_fuzzy():
+            # Every ranking the dialog goes on to show, up to the complete one
+            clear_recipe_caches()
+            for _ in core.fuzzy_recipe_matches():
+                pass
+        results["suggest_recipes_fuzzy"] = time_calls(suggest_recipes_fuzzy, repeat)
+
+        model_class = table_model_class()
+        if model_class is None:
+            results["update_food_list"] = {"skipped": "PyQt5 is not installed"}
+        else:
+            model = model_class(core)
+            results["update_food_list"] = time_calls(model.reload, repeat)
+
+        results["generate_report"] = time_calls(lambda: core.compute_report("monthly"), repeat)
+        core.close()
+
+        # Cold start parses the JSON, the warm start after it reads the parsed cache
+        cache_file = core.data_file.with_suffix('.cache')
+        if cache_file.exists():
+            cache_file.unlink()
+        results["startup_cold"] = time_startup(storage_mode, app_dir)
+        results["startup_warm"] = time_startup(storage_mode, app_dir)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per path")
+    parser.add_argument("--storage", default="json", choices=["json", "journal", "sqlite"])
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "storage_mode": args.storage,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": {}
+    }
+    # Keep the logger's progress messages out of the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        for size in args.sizes:
+            report["results"][str(size)] = bench_size(size, args.repeat, args.storage, args.seed)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Column-oriented analytics over the inventory and its history, using NumPy
+
+The inventory and the event history are mirrored as NumPy columns of date
+ordinals, category codes, event type codes and quantities, so reports,
+waste rates, spoilage per category, days-to-expiry histograms and rollups
+over any date range are a handful of vectorized operations even with
+millions of history records. NumPy is optional: without it np is None and
+InventoryCore computes its reports item by item instead.
+"""
+import json
+import os
+import tempfile
+from datetime import date
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from food_history import EVENT_TYPES, REMOVAL_REASONS
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()  # datetime64[D] counts days from here
+WASTE_TYPES = ("discarded", "expired")
+# Edges of the days-to-expiry histogram; each bin holds low <= days left < high
+EXPIRY_BINS = [-365, -7, 0, 1, 4, 8, 15, 31, 91, 366]
+
+
+def ordinal_strings(ordinals):
+    """Format an array of date ordinals as YYYY-MM-DD strings"""
+    return (np.asarray(ordinals, dtype=np.int64) - EPOCH_ORDINAL).astype('datetime64[D]').astype(str).tolist()
+
+
+class AnalyticsEngine:
+    """Inventory and history columns with the report computations built on them
+
+    The history columns are extended incrementally from the event log and
+    saved next to it with the byte offset they cover, like the EventLog
+    daily totals, so a restart does not parse the whole history again.
+    The inventory columns are rebuilt when the inventory version changes.
+    """
+
+    def __init__(self, history_file):
+        self.history_file = Path(history_file)
+        self.cache_file = self.history_file.with_name(self.history_file.stem + "_columns.npz")
+        self.categories = []       # Category code -> name
+        self.category_codes = {}   # Name -> category code
+        self.type_codes = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+        self.offset = 0            # Bytes of the history already in the columns
+        self.event_days = np.zeros(0, dtype=np.int32)
+        self.event_types = np.zeros(0, dtype=np.int8)
+        self.event_categories = np.zeros(0, dtype=np.int32)
+        self.event_quantities = np.zeros(0, dtype=np.float64)
+        self.unsaved = 0
+
+        self.inventory_version = None
+        self.names = []
+        self.purchase = np.zeros(0, dtype=np.int32)
+        self.expiry = np.zeros(0, dtype=np.int32)
+        self.item_categories = np.zeros(0, dtype=np.int32)
+        self.quantities = np.zeros(0, dtype=np.float64)
+        self.load_cache()
+
+    def category_code(self, category):
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def load_cache(self):
+        """Restore the history columns saved by save(), if they still match the log"""
+        if not self.cache_file.exists():
+            return
+        try:
+            with np.load(self.cache_file) as saved:
+                offset = int(saved['offset'])
+                size = self.history_file.stat().st_size if self.history_file.exists() else 0
+                if offset > size:
+                    return  # The log was replaced or truncated since
+                for category in saved['categories'].tolist():
+                    self.category_code(category)
+                self.event_days = saved['days']
+                self.event_types = saved['types']
+                self.event_categories = saved['categories_codes']
+                self.event_quantities = saved['quantities']
+                self.offset = offset
+        except Exception as e:
+            print(f"Error loading history columns: {e}")
+
+    def save(self):
+        """Save the history columns and the log offset they cover"""
+        if not self.unsaved:
+            return
+        # A temp file of our own: other loggers sharing the directory save theirs too
+        with tempfile.NamedTemporaryFile(dir=self.cache_file.parent, suffix=".tmp.npz", delete=False) as file:
+            try:
+                np.savez(file, offset=np.int64(self.offset), categories=np.array(self.categories, dtype=str),
+                         days=self.event_days, types=self.event_types, categories_codes=self.event_categories,
+                         quantities=self.event_quantities)
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+        os.replace(file.name, self.cache_file)
+        self.unsaved = 0
+
+    def sync_history(self):
+        """Append the events logged since the last sync to the history columns"""
+        size = self.history_file.stat().st_size if self.history_file.exists() else 0
+        if size < self.offset:
+            # The log was replaced or truncated, start over
+            self.offset = 0
+            self.event_days = self.event_days[:0]
+            self.event_types = self.event_types[:0]
+            self.event_categories = self.event_categories[:0]
+            self.event_quantities = self.event_quantities[:0]
+        if size == self.offset:
+            return
+
+        days, types, categories, quantities = [], [], [], []
+        with open(self.history_file, 'rb') as file:
+            file.seek(self.offset)
+            for line in file:
+                if not line.endswith(b'\n'):
+                    break  # Still being written
+                event = json.loads(line)
+                days.append(date.fromisoformat(event['timestamp'][:10]).toordinal())
+                types.append(self.type_codes[event['type']])
+                categories.append(self.category_code(event['category']))
+                quantities.append(event['quantity'] or 0)
+                self.offset += len(line)
+
+        self.event_days = np.concatenate([self.event_days, np.array(days, dtype=np.int32)])
+        self.event_types = np.concatenate([self.event_types, np.array(types, dtype=np.int8)])
+        self.event_categories = np.concatenate([self.event_categories, np.array(categories, dtype=np.int32)])
+        self.event_quantities = np.concatenate([self.event_quantities, np.array(quantities, dtype=np.float64)])
+        self.unsaved += len(days)
+
+    def sync_inventory(self, food_items, version):
+        """Rebuild the inventory columns if the inventory changed since the last sync"""
+        if version == self.inventory_version:
+            return
+        items = list(food_items.values())
+        count = len(items)
+        self.names = [item.name for item in items]
+        self.purchase = np.fromiter((item.purchase_ordinal for item in items), dtype=np.int32, count=count)
+        self.expiry = np.fromiter((item.expiry_ordinal for item in items), dtype=np.int32, count=count)
+        self.item_categories = np.fromiter((self.category_code(item.category) for item in items),
+                                           dtype=np.int32, count=count)
+        self.quantities = np.fromiter((item.quantity or 0 for item in items), dtype=np.float64, count=count)
+        self.inventory_version = version
+
+    def event_mask(self, start_date, end_date, category=None):
+        """Boolean mask of the events logged between start_date and end_date inclusive"""
+        mask = (self.event_days >= start_date.toordinal()) & (self.event_days <= end_date.toordinal())
+        if category is not None:
+            mask &= self.event_categories == self.category_codes.get(category, -1)
+        return mask
+
+    def totals(self, start_date, end_date, category=None):
+        """Count events of each type between start_date and end_date, like EventLog.totals"""
+        counts = np.bincount(self.event_types[self.event_mask(start_date, end_date, category)],
+                             minlength=len(EVENT_TYPES))
+        return {event_type: int(counts[code]) for event_type, code in self.type_codes.items()}
+
+    def report(self, start_date, end_date, today):
+        """Report data in the shape of InventoryCore.compute_report"""
+        today_ordinal = today.toordinal()
+        selected = np.flatnonzero((self.purchase >= start_date.toordinal()) & (self.purchase <= end_date.toordinal()))
+        expired_now = self.expiry[selected] < today_ordinal
+        statuses = np.where(expired_now, "Expired", "Active").tolist()
+        names = self.names
+        categories = self.categories
+        report_items = [{
+            'name': names[index],
+            'category': categories[code],
+            'status': status,
+            'purchase_date': purchase_date,
+            'expiry_date': expiry_date
+        } for index, code, status, purchase_date, expiry_date in zip(
+            selected.tolist(), self.item_categories[selected].tolist(), statuses,
+            ordinal_strings(self.purchase[selected]), ordinal_strings(self.expiry[selected]))]
+
+        removed = self.totals(start_date, end_date)
+        active_items = len(selected)
+        consumed_items = removed['consumed']
+        wasted_items = sum(removed[reason] for reason in WASTE_TYPES)
+        expired_items = int(expired_now.sum()) + wasted_items
+        total_items = active_items + consumed_items + wasted_items
+
+        return {
+            'start_date': start_date.strftime('%Y-%m-%d'),
+            'end_date': end_date.strftime('%Y-%m-%d'),
+            'total_items': total_items,
+            'expired_items': expired_items,
+            'consumed_items': consumed_items,
+            'waste_percentage': (expired_items / total_items) * 100 if total_items > 0 else 0,
+            'items': report_items
+        }
+
+    def waste_rate(self, start_date, end_date, category=None):
+        """Percentage of the items removed between the dates that were wasted rather than eaten"""
+        removed = self.totals(start_date, end_date, category)
+        wasted = sum(removed[reason] for reason in WASTE_TYPES)
+        total = sum(removed[reason] for reason in REMOVAL_REASONS)
+        return wasted / total * 100 if total else 0.0
+
+    def spoilage_by_category(self, start_date, end_date):
+        """Removed and wasted item counts and quantities per category between the dates"""
+        mask = self.event_mask(start_date, end_date)
+        removed = mask & np.isin(self.event_types, [self.type_codes[reason] for reason in REMOVAL_REASONS])
+        wasted = mask & np.isin(self.event_types, [self.type_codes[reason] for reason in WASTE_TYPES])
+        size = len(self.categories)
+        removed_counts = np.bincount(self.event_categories[removed], minlength=size)
+        wasted_counts = np.bincount(self.event_categories[wasted], minlength=size)
+        wasted_quantities = np.bincount(self.event_categories[wasted], weights=self.event_quantities[wasted],
+                                        minlength=size)
+        return {
+            self.categories[code]: {
+                'removed_items': int(removed_counts[code]),
+                'wasted_items': int(wasted_counts[code]),
+                'wasted_quantity': float(wasted_quantities[code]),
+                'waste_percentage': float(wasted_counts[code] / removed_counts[code] * 100)
+            }
+            for code in np.flatnonzero(removed_counts).tolist()
+        }
+
+    def expiry_histogram(self, today, bins=EXPIRY_BINS, category=None):
+        """Count current items by days left until expiry, one entry per bin of bins"""
+        days_left = self.expiry - today.toordinal()
+        if category is not None:
+            days_left = days_left[self.item_categories == self.category_codes.get(category, -1)]
+        edges = np.asarray(bins)
+        counts = np.bincount(np.searchsorted(edges, days_left, side='right'), minlength=len(edges) + 1)
+        # counts[0] and counts[-1] fall outside the bins
+        return [{'from_days': int(low), 'to_days': int(high) - 1, 'items': int(count)}
+                for low, high, count in zip(edges[:-1], edges[1:], counts[1:-1])]
+
+    def rollup(self, start_date, end_date, period="day", category=None):
+        """Count events of each type per day, week (starting Monday) or month between the dates"""
+        mask = self.event_mask(start_date, end_date, category)
+        days = self.event_days[mask].astype(np.int64)
+        if period == "day":
+            keys = days
+        elif period == "week":
+            keys = days - (days - 1) % 7  # Ordinal 1 is a Monday
+        elif period == "month":
+            keys = (days - EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        else:
+            raise ValueError(f"Unknown rollup period: {period}")
+
+        periods, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse * len(EVENT_TYPES) + self.event_types[mask],
+                             minlength=len(periods) * len(EVENT_TYPES)).reshape(len(periods), len(EVENT_TYPES))
+        if period == "month":
+            labels = periods.astype('datetime64[M]').astype(str).tolist()
+        else:
+            labels = ordinal_strings(periods)
+        return [dict({'period': label}, **{event_type: int(row[code]) for event_type, code in self.type_codes.items()})
+                for label, row in zip(labels, counts)]
@@ -0,0 +1,131 @@
+"""History of what happened to inventory items after they were added"""
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from food_storage import file_lock
+from instrumentation import metrics
+
+# "used" records part of a lot taken while the rest stays in the inventory, so
+# reports counting items leave it out; new types go last to keep their codes
+EVENT_TYPES = ("added", "consumed", "discarded", "expired", "used")
+REMOVAL_REASONS = ("consumed", "discarded", "expired")
+
+
+def make_event(event_type, item_id, item_data, when=None):
+    """Build a history event for an item"""
+    if when is None:
+        when = datetime.now()
+    return {
+        "type": event_type,
+        "timestamp": when.isoformat(timespec='seconds'),
+        "item_id": item_id,
+        "name": item_data['name'],
+        "category": item_data['category'],
+        "quantity": item_data['quantity']
+    }
+
+
+class EventLog:
+    """Append-only JSON Lines log of inventory events with daily totals
+
+    Besides writing each event, the log keeps per-day, per-category counts of
+    every event type. The counts are saved next to the log together with the
+    byte offset they cover, so loading only replays events written since, and
+    reports read the counts instead of the whole history.
+
+    Several loggers may append to the same log. Appends and saves hold an
+    fcntl lock on a .lock file next to it, and each append first folds in
+    whatever the others logged since, so the offset always lands at the
+    end of a whole event.
+    """
+
+    def __init__(self, history_file, save_every=1000):
+        self.history_file = Path(history_file)
+        self.aggregates_file = self.history_file.with_name(self.history_file.stem + "_aggregates.json")
+        self.lock_file = self.history_file.with_suffix('.lock')
+        self.save_every = save_every
+        self.days = {}  # day ordinal -> {category: {event type: count}}
+        self.offset = 0  # Bytes of the log already folded into days
+        self.unsaved = 0
+
+    def load(self):
+        """Load the saved totals and fold in any events logged after them"""
+        self.days = {}
+        self.offset = 0
+        if self.aggregates_file.exists():
+            with open(self.aggregates_file, 'r') as file:
+                saved = json.load(file)
+            self.offset = saved['offset']
+            for day, categories in saved['days'].items():
+                self.days[int(day)] = categories
+
+        with file_lock(self.lock_file):
+            self.read_new_events()
+
+    def read_new_events(self):
+        """Fold in the events logged after self.offset, by us or by other loggers; callers hold the lock"""
+        size = self.history_file.stat().st_size if self.history_file.exists() else 0
+        if self.offset > size:
+            # The log was replaced or truncated, so the totals no longer match it
+            self.days = {}
+            self.offset = 0
+
+        if self.offset < size:
+            with open(self.history_file, 'rb+') as file:
+                file.seek(self.offset)
+                for line in file:
+                    if not line.endswith(b'\n'):
+                        # Drop an event torn by a crash so later appends stay readable
+                        file.truncate(self.offset)
+                        break
+                    self.count(json.loads(line))
+                    self.offset += len(line)
+                    self.unsaved += 1
+
+    def count(self, event):
+        """Add one event to the daily totals"""
+        day = datetime.fromisoformat(event['timestamp']).date().toordinal()
+        counts = self.days.setdefault(day, {}).setdefault(event['category'], {})
+        counts[event['type']] = counts.get(event['type'], 0) + 1
+
+    def append(self, events):
+        """Write events to the log and update the totals"""
+        data = b''.join(json.dumps(event).encode('utf-8') + b'\n' for event in events)
+        with file_lock(self.lock_file):
+            # Other loggers' events logged since our last append come first
+            self.read_new_events()
+            with open(self.history_file, 'ab') as file:
+                file.write(data)
+                self.offset = file.tell()
+        metrics.add_bytes("record_events", len(data))
+
+        for event in events:
+            self.count(event)
+        self.unsaved += len(events)
+        if self.unsaved >= self.save_every:
+            self.save_aggregates()
+
+    def save_aggregates(self):
+        """Write the daily totals and the log offset they cover"""
+        temp_file = self.aggregates_file.with_suffix('.tmp')
+        with file_lock(self.lock_file):
+            with open(temp_file, 'w') as file:
+                json.dump({'offset': self.offset, 'days': self.days}, file)
+            os.replace(temp_file, self.aggregates_file)
+        self.unsaved = 0
+
+    def totals(self, start_date, end_date, category=None):
+        """Count events of each type between start_date and end_date inclusive"""
+        totals = dict.fromkeys(EVENT_TYPES, 0)
+        for day in range(start_date.toordinal(), end_date.toordinal() + 1):
+            for name, counts in self.days.get(day, {}).items():
+                if category is None or name == category:
+                    for event_type, count in counts.items():
+                        totals[event_type] = totals.get(event_type, 0) + count
+        return totals
+
+    def close(self):
+        if self.unsaved:
+            self.save_aggregates()
@@ -0,0 +1,306 @@
+"""In-memory indexes kept alongside the Food Waste Logger inventory"""
+from bisect import bisect_left, bisect_right, insort
+
+
+class ExpiryIndex:
+    """Item ids kept sorted by expiry date
+
+    Entries are (expiry ordinal, item_id) pairs in a bisect-sorted list, so
+    date range queries cost O(log n + k) instead of a scan of every item.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.keys = {}  # item_id -> entry currently stored for it
+
+    def __len__(self):
+        return len(self.entries)
+
+    def rebuild(self, food_items):
+        """Rebuild the index from scratch for the given items"""
+        self.keys = {item_id: (item_data.expiry_ordinal, item_id)
+                     for item_id, item_data in food_items.items()}
+        self.entries = sorted(self.keys.values())
+
+    def add(self, item_id, expiry_date):
+        """Index an item, replacing any entry it already had"""
+        self.discard(item_id)
+        entry = (expiry_date.toordinal(), item_id)
+        insort(self.entries, entry)
+        self.keys[item_id] = entry
+
+    def discard(self, item_id):
+        """Drop an item from the index if it is present"""
+        entry = self.keys.pop(item_id, None)
+        if entry is not None:
+            position = bisect_left(self.entries, entry)
+            del self.entries[position]
+
+    def between(self, start_date=None, end_date=None):
+        """Return the ids expiring between start_date and end_date inclusive, soonest first
+
+        Either bound may be None to leave that side of the range open.
+        """
+        low = 0
+        if start_date is not None:
+            low = bisect_left(self.entries, (start_date.toordinal(),))
+        high = len(self.entries)
+        if end_date is not None:
+            # (ordinal + 1,) sorts after every entry expiring on end_date
+            high = bisect_right(self.entries, (end_date.toordinal() + 1,))
+        return [item_id for _, item_id in self.entries[low:high]]
+
+
+class ProductIndex:
+    """Inventory items grouped into products by (name, category)
+
+    Each item is one dated lot of its product. A product keeps its lots
+    sorted by expiry date, earliest first, together with its total quantity,
+    so product views cost O(products) and first-in-first-out consumption
+    finds the next lot without looking at the rest of the inventory.
+    """
+
+    def __init__(self):
+        self.lots = {}    # (name, category) -> [(expiry ordinal, item_id)], soonest first
+        self.totals = {}  # (name, category) -> total quantity of its lots
+        self.keys = {}    # item_id -> (product, lot entry, quantity)
+
+    def __len__(self):
+        return len(self.lots)
+
+    def rebuild(self, food_items):
+        """Rebuild the index from scratch for the given items"""
+        self.lots = {}
+        self.totals = {}
+        self.keys = {}
+        for item_id, item_data in food_items.items():
+            product = (item_data.name, item_data.category)
+            entry = (item_data.expiry_ordinal, item_id)
+            quantity = item_data.quantity or 0
+            self.lots.setdefault(product, []).append(entry)
+            self.totals[product] = self.totals.get(product, 0) + quantity
+            self.keys[item_id] = (product, entry, quantity)
+        for lots in self.lots.values():
+            lots.sort()
+
+    def add(self, item_id, item_data):
+        """Index an item as a lot of its product, replacing any entry it already had"""
+        self.discard(item_id)
+        product = (item_data.name, item_data.category)
+        entry = (item_data.expiry_ordinal, item_id)
+        quantity = item_data.quantity or 0
+        insort(self.lots.setdefault(product, []), entry)
+        self.totals[product] = self.totals.get(product, 0) + quantity
+        self.keys[item_id] = (product, entry, quantity)
+
+    def discard(self, item_id):
+        """Drop an item from the index if it is present"""
+        key = self.keys.pop(item_id, None)
+        if key is None:
+            return
+        product, entry, quantity = key
+        lots = self.lots[product]
+        del lots[bisect_left(lots, entry)]
+        if lots:
+            self.totals[product] -= quantity
+        else:
+            del self.lots[product]
+            del self.totals[product]
+
+    def product_of(self, item_id):
+        """Return the (name, category) product an item is a lot of, or None"""
+        key = self.keys.get(item_id)
+        return key[0] if key is not None else None
+
+    def lot_ids(self, product):
+        """Return the item ids of a product's lots, earliest expiry first"""
+        return [item_id for _, item_id in self.lots.get(product, ())]
+
+
+def trigrams(text):
+    """Return the set of three character substrings of text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Item ids by the words of their name and category, for filtering as the user types
+
+    A query matches an item when every query word occurs in the item's
+    lowercased "name category" text. Words of three or more characters are
+    looked up in a trigram index and confirmed with a substring test; shorter
+    words are matched against the start of the item's words through a
+    prefix index, since "eg" occurring anywhere is rarely what was meant.
+    Inventories repeat the same products, so the text indexes hold each
+    distinct text once and lookups only touch items through matching texts.
+    """
+
+    def __init__(self):
+        self.texts = {}       # item_id -> lowercased "name category"
+        self.text_items = {}  # text -> item ids
+        self.grams = {}       # trigram -> texts
+        self.prefixes = {}    # first one or two letters of a word -> texts
+        self.last_query = None
+        self.last_texts = None
+
+    def keys(self, text):
+        """Return the trigrams and short word prefixes of text"""
+        prefixes = set()
+        for word in text.split():
+            prefixes.add(word[:1])
+            prefixes.add(word[:2])
+        return trigrams(text), prefixes
+
+    def rebuild(self, food_items):
+        """Rebuild the index from scratch for the given items"""
+        self.texts = {}
+        self.text_items = {}
+        self.grams = {}
+        self.prefixes = {}
+        for item_id, item_data in food_items.items():
+            self.add(item_id, item_data.name, item_data.category)
+
+    def add(self, item_id, name, category):
+        """Index an item, replacing any entry it already had"""
+        self.discard(item_id)
+        text = f"{name} {category}".lower()
+        self.texts[item_id] = text
+        if text not in self.text_items:
+            self.text_items[text] = set()
+            grams, prefixes = self.keys(text)
+            for gram in grams:
+                self.grams.setdefault(gram, set()).add(text)
+            for prefix in prefixes:
+                self.prefixes.setdefault(prefix, set()).add(text)
+            self.last_query = None
+        self.text_items[text].add(item_id)
+
+    def discard(self, item_id):
+        """Drop an item from the index if it is present"""
+        text = self.texts.pop(item_id, None)
+        if text is None:
+            return
+        ids = self.text_items[text]
+        ids.discard(item_id)
+        if ids:
+            return
+        del self.text_items[text]
+        grams, prefixes = self.keys(text)
+        for postings, keys in ((self.grams, grams), (self.prefixes, prefixes)):
+            for key in keys:
+                texts = postings[key]
+                texts.discard(text)
+                if not texts:
+                    del postings[key]
+        self.last_query = None
+
+    def word_matches(self, word, text):
+        if len(word) < 3:
+            return any(part.startswith(word) for part in text.split())
+        return word in text
+
+    def matches(self, item_id, query):
+        """Return whether the item matches query"""
+        text = self.texts.get(item_id)
+        return text is not None and all(self.word_matches(word, text) for word in query.lower().split())
+
+    def candidates(self, word):
+        """Return the texts that may contain word"""
+        if len(word) < 3:
+            return self.prefixes.get(word, set())
+        postings = sorted((self.grams.get(gram, set()) for gram in trigrams(word)), key=len)
+        return {text for text in postings[0] if all(text in texts for texts in postings[1:])}
+
+    def search(self, query):
+        """Return the set of ids of the items matching query
+
+        While the user keeps typing, each query usually extends the last one,
+        so its matches are narrowed down instead of searched again. That only
+        holds once every word is long enough to be matched as a substring.
+        """
+        query = query.lower()
+        words = query.split()
+        last_words = self.last_query.split() if self.last_query is not None else []
+        if (last_words and query.startswith(self.last_query) and len(words) == len(last_words)
+                and all(len(word) >= 3 for word in last_words)):
+            matched = {text for text in self.last_texts if all(self.word_matches(word, text) for word in words)}
+        else:
+            matched = None
+            for word in sorted(words, key=len, reverse=True):
+                texts = self.candidates(word)
+                matched = {text for text in (texts if matched is None else matched & texts)
+                           if self.word_matches(word, text)}
+                if not matched:
+                    break
+        self.last_query = query
+        self.last_texts = matched or set()
+        return set().union(*(self.text_items[text] for text in self.last_texts))
+
+
+class RecipeIndex:
+    """Inverted index from normalized ingredient names to the recipes using them
+
+    An inventory name matches a recipe ingredient when either lowercased
+    string contains the other. Two strings of three or more characters can
+    only do that if they share a trigram, so candidates come from a trigram
+    index over the distinct ingredients and are then confirmed with the
+    substring test. Shorter strings are checked directly.
+    """
+
+    def __init__(self, recipes):
+        self.recipes = recipes
+        self.ingredient_recipes = {}  # normalized ingredient -> recipe positions
+        self.trigram_ingredients = {}  # trigram -> normalized ingredients
+        self.short_ingredients = []
+
+        for position, recipe in enumerate(recipes):
+            for ingredient in recipe['ingredients']:
+                normalized = ingredient.lower()
+                positions = self.ingredient_recipes.setdefault(normalized, [])
+                if not positions or positions[-1] != position:
+                    positions.append(position)
+
+        for normalized in self.ingredient_recipes:
+            if len(normalized) < 3:
+                self.short_ingredients.append(normalized)
+            for gram in trigrams(normalized):
+                self.trigram_ingredients.setdefault(gram, set()).add(normalized)
+
+    def matching_ingredients(self, name):
+        """Return the normalized ingredients that match one inventory name"""
+        name = name.lower()
+        if len(name) < 3:
+            candidates = self.ingredient_recipes
+        else:
+            candidates = set(self.short_ingredients)
+            for gram in trigrams(name):
+                candidates.update(self.trigram_ingredients.get(gram, ()))
+        return {ingredient for ingredient in candidates
+                if ingredient in name or name in ingredient}
+
+    def match(self, ingredient_list):
+        """Score the recipes sharing an ingredient with ingredient_list, best first"""
+        matched = set()
+        for name in set(ingredient_list):
+            matched |= self.matching_ingredients(name)
+        return self.rank(matched)
+
+    def rank(self, matched):
+        """Score the recipes using any of the matched normalized ingredients, best first"""
+        positions = set()
+        for ingredient in matched:
+            positions.update(self.ingredient_recipes[ingredient])
+
+        matching_recipes = []
+        for position in sorted(positions):
+            recipe = self.recipes[position]
+            matched_ingredients = [ingredient for ingredient in recipe['ingredients']
+                                   if ingredient.lower() in matched]
+            matching_recipes.append({
+                'recipe': recipe,
+                'match_count': len(matched_ingredients),
+                'match_percentage': (len(matched_ingredients) / len(recipe['ingredients'])) * 100,
+                'matched_ingredients': matched_ingredients
+            })
+
+        matching_recipes.sort(key=lambda x: x['match_count'], reverse=True)
+        return matching_recipes
@@ -0,0 +1,168 @@
+"""Compact record for a single inventory item"""
+import os
+import re
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+DATE_FORMAT = '%Y-%m-%d'
+ITEM_ID_PATTERN = re.compile(r'[0-9a-f]{22}')
+
+
+class FoodItem:
+    """One inventory item, stored without a per-item dict
+
+    Dates are kept as int ordinals and name and category strings are interned,
+    which matters once the inventory holds hundreds of thousands of items. The
+    item still reads like the dicts it replaces: item['expiry_date'],
+    item.get('quantity') and 'name' in item all work, and dict(item) gives
+    a plain dict.
+    """
+    __slots__ = ('name', 'category', 'quantity', 'purchase_ordinal', 'expiry_ordinal')
+    fields = ('name', 'category', 'quantity', 'purchase_date', 'expiry_date')
+
+    def __init__(self, name, category, quantity, purchase_date, expiry_date):
+        self.name = sys.intern(name)
+        self.category = sys.intern(category)
+        self.quantity = quantity
+        self.purchase_ordinal = purchase_date.toordinal()
+        self.expiry_ordinal = expiry_date.toordinal()
+
+    @property
+    def purchase_date(self):
+        return date.fromordinal(self.purchase_ordinal)
+
+    @property
+    def expiry_date(self):
+        return date.fromordinal(self.expiry_ordinal)
+
+    def __getitem__(self, key):
+        if key not in self.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.fields else default
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def keys(self):
+        return self.fields
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.fields]
+
+    def copy(self):
+        return FoodItem(self.name, self.category, self.quantity, self.purchase_date, self.expiry_date)
+
+    def __eq__(self, other):
+        if isinstance(other, FoodItem):
+            return (self.name, self.category, self.quantity, self.purchase_ordinal, self.expiry_ordinal) == \
+                   (other.name, other.category, other.quantity, other.purchase_ordinal, other.expiry_ordinal)
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"FoodItem({dict(self.items())!r})"
+
+    def to_record(self):
+        """Return a JSON friendly dict with the dates as YYYY-MM-DD strings"""
+        return {
+            "name": self.name,
+            "category": self.category,
+            "quantity": self.quantity,
+            "purchase_date": self.purchase_date.isoformat(),
+            "expiry_date": self.expiry_date.isoformat()
+        }
+
+    def to_tuple(self):
+        """Return the raw fields, as stored in the parsed inventory cache"""
+        return (self.name, self.category, self.quantity, self.purchase_ordinal, self.expiry_ordinal)
+
+    @classmethod
+    def from_tuple(cls, fields):
+        """Rebuild an item from to_tuple() output without parsing any dates"""
+        item = cls.__new__(cls)
+        name, category, item.quantity, item.purchase_ordinal, item.expiry_ordinal = fields
+        item.name = sys.intern(name)
+        item.category = sys.intern(category)
+        return item
+
+    @classmethod
+    def from_record(cls, record):
+        """Build an item from a stored record, falling back to sensible dates"""
+        try:
+            purchase_date = date.fromisoformat(record['purchase_date'])
+        except (KeyError, TypeError, ValueError):
+            purchase_date = datetime.now().date()
+
+        try:
+            expiry_date = date.fromisoformat(record['expiry_date'])
+        except (KeyError, TypeError, ValueError):
+            expiry_date = datetime.now().date() + timedelta(days=7)
+
+        return cls(record['name'], record.get('category') or "", record.get('quantity', 0),
+                   purchase_date, expiry_date)
+
+
+class ItemIdGenerator:
+    """Collision-free item ids that sort by creation time
+
+    An id is 12 hex digits of milliseconds since the epoch, a 4 digit
+    sequence number within that millisecond and a 6 digit tag chosen at
+    random per process, so two loggers sharing a file do not collide either.
+    If more than 65536 ids are requested within one millisecond, or the clock
+    steps back, the time part borrows from the next millisecond so ids keep
+    increasing.
+    """
+
+    def __init__(self):
+        self.last_millis = 0
+        self.sequence = 0
+        self.node = os.urandom(3).hex()
+        self.lock = threading.Lock()
+
+    def next_id(self):
+        with self.lock:
+            millis = time.time_ns() // 1_000_000
+            if millis > self.last_millis:
+                self.last_millis = millis
+                self.sequence = 0
+            else:
+                self.sequence += 1
+                if self.sequence > 0xFFFF:
+                    self.last_millis += 1
+                    self.sequence = 0
+            return f"{self.last_millis:012x}{self.sequence:04x}{self.node}"
+
+
+def migrate_legacy_ids(food_items):
+    """Give items with old name+timestamp ids a new id, keeping their order
+
+    Legacy ids end with the Unix time in seconds at which they were created.
+    Returns a new dict, or None when every id is already in the new format.
+    """
+    legacy = {item_id for item_id in food_items if not ITEM_ID_PATTERN.fullmatch(item_id)}
+    if not legacy:
+        return None
+
+    def created_millis(item_id):
+        digits = re.search(r'(\d+)$', item_id)
+        return int(digits.group(1)) * 1000 if digits else 0
+
+    migrated = {item_id: item_data for item_id, item_data in food_items.items() if item_id not in legacy}
+    last_millis, sequence = -1, 0
+    for item_id in sorted(legacy, key=lambda item_id: (created_millis(item_id), item_id)):
+        millis = created_millis(item_id)
+        sequence = sequence + 1 if millis == last_millis else 0
+        last_millis = millis
+        # The all-zero tag marks ids produced by this migration
+        new_id = f"{millis + (sequence >> 16):012x}{sequence & 0xFFFF:04x}000000"
+        migrated[new_id] = food_items[item_id]
+    return migrated
@@ -0,0 +1,553 @@
+"""Persistence helpers for the Food Waste Logger inventory"""
+import json
+import marshal
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from food_item import FoodItem
+from instrumentation import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: files are not locked against other loggers
+    fcntl = None
+
+
+def item_to_record(item_data):
+    """Convert an inventory item into a JSON friendly record"""
+    return item_data.to_record()
+
+
+def record_to_item(record):
+    """Build an inventory item from a stored record"""
+    return FoodItem.from_record(record)
+
+
+@contextmanager
+def file_lock(lock_file):
+    """Hold an exclusive lock on lock_file, shared with other loggers using the same data directory
+
+    flock() rather than lockf(): POSIX record locks belong to the whole
+    process, so a logger holding the inventory lock on its persistence
+    thread while waiting for the history lock on another would be refused
+    with EDEADLK by the kernel's deadlock detection.
+    """
+    if lock_file is None or fcntl is None:
+        yield
+        return
+    with open(lock_file, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def file_stamp(stat):
+    """Identify one version of a file from its os.stat() result"""
+    return [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
+
+class StorageBackend:
+    """Interface shared by the inventory storage backends
+
+    load() returns the item dict, save_all() writes the whole inventory and
+    apply() persists a list of (op, item_id, item_data) changes. Backends
+    with rewrites_all set need the whole inventory for every save.
+    """
+    rewrites_all = True
+
+    def load(self):
+        raise NotImplementedError
+
+    def save_all(self, food_items):
+        raise NotImplementedError
+
+    def apply(self, changes, food_items):
+        """Persist the given changes; by default the whole inventory is rewritten"""
+        self.save_all(food_items)
+
+    def changed_externally(self):
+        """Whether another logger has changed the stored inventory since we last loaded it"""
+        return False
+
+    def watch_paths(self):
+        """Files whose modification may mean another logger changed the inventory"""
+        return []
+
+    def close(self):
+        pass
+
+
+class JsonStore(StorageBackend):
+    """Whole inventory kept in one JSON file, rewritten on every save
+
+    A marshal snapshot of the already parsed items is kept next to the JSON
+    file. It records the inode, size and modification time of the JSON it
+    was made from, so a launch whose JSON is unchanged skips the JSON and
+    date parsing, and any edit made outside the logger simply invalidates it.
+
+    Several loggers may share the file. Writes hold an fcntl lock on a
+    .lock file next to it, and the store remembers the stamp of the file it
+    last read or wrote: if another logger replaced the file since, its
+    items are read back first and our changes are applied on top of them
+    item by item, so nobody's additions are lost. Those items still count
+    as an external change until the next load() hands them to the caller.
+    """
+    rewrites_all = False
+    cache_version = 1
+
+    def __init__(self, data_file, shared=True):
+        self.data_file = Path(data_file)
+        self.backup_file = self.data_file.with_name(self.data_file.stem + "_backup.json")
+        # Exports and imports pass shared=False to leave no cache or lock next to the user's file
+        self.cache_file = self.data_file.with_suffix('.cache') if shared else None
+        self.lock_file = self.data_file.with_suffix('.lock') if shared else None
+        self.items = {}    # Items as of the file version we last read or wrote
+        self.stamp = None  # [inode, mtime, size] of that version, None if there was no file
+        self.merged = False  # apply() wrote other loggers' items that load() has not returned yet
+
+    def locked(self):
+        """Hold the write lock shared with other loggers using the same file"""
+        return file_lock(self.lock_file)
+
+    def load(self):
+        self.merged = False
+        self.items = self.read_file()
+        return dict(self.items)
+
+    def read_file(self):
+        """Read the items from the file, noting the stamp of the version read"""
+        try:
+            file = open(self.data_file, 'rb')
+        except FileNotFoundError:
+            self.stamp = None
+            return {}
+        with file:
+            # Stamp the open file: a writer replacing the path meanwhile cannot mismatch it
+            self.stamp = file_stamp(os.fstat(file.fileno()))
+            cached = self.read_cache()
+            if cached is not None:
+                return cached
+            data = json.load(file)
+        food_items = {item_id: record_to_item(record) for item_id, record in data.items()}
+        self.write_cache(food_items)
+        return food_items
+
+    def changed_externally(self):
+        """Whether another logger has written the file since we last loaded it"""
+        return self.merged or self.replaced()
+
+    def replaced(self):
+        """Whether the file is no longer the version we last read or wrote"""
+        try:
+            return file_stamp(self.data_file.stat()) != self.stamp
+        except FileNotFoundError:
+            return self.stamp is not None
+
+    def watch_paths(self):
+        return [self.data_file]
+
+    def read_cache(self):
+        """Return the cached items if the cache matches the JSON file, else None"""
+        if self.cache_file is None:
+            return None
+        try:
+            with open(self.cache_file, 'rb') as file:
+                cache = marshal.loads(file.read())  # marshal.load reads a file in small chunks
+            if (cache['version'] != self.cache_version
+                    or cache['python'] != list(sys.version_info[:2])
+                    or cache['source'] != self.stamp):
+                return None
+            return {item_id: FoodItem.from_tuple(fields) for item_id, fields in cache['items'].items()}
+        except Exception:
+            # A missing, stale or unreadable cache only costs a JSON parse
+            return None
+
+    def write_cache(self, food_items):
+        """Snapshot the parsed items for the file version in self.stamp"""
+        if self.cache_file is None:
+            return
+        cache = {
+            "version": self.cache_version,
+            "python": list(sys.version_info[:2]),
+            "source": self.stamp,
+            "items": {item_id: item_data.to_tuple() for item_id, item_data in food_items.items()}
+        }
+        try:
+            temp_file = self.cache_file.with_suffix('.cache.tmp')
+            with open(temp_file, 'wb') as file:
+                file.write(marshal.dumps(cache))
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            print(f"Warning: Could not write inventory cache: {e}")
+
+    def save_all(self, food_items):
+        with self.locked():
+            self.items = dict(food_items)
+            self.write_file()
+
+    def apply(self, changes, food_items):
+        """Write the changes on top of the newest version of the file"""
+        with self.locked():
+            if self.replaced():
+                self.items = self.read_file()
+                self.merged = True
+            for op, item_id, item_data in changes:
+                if op == "add":
+                    self.items[item_id] = item_data
+                else:
+                    self.items.pop(item_id, None)
+            self.write_file()
+
+    def write_file(self):
+        """Replace the file with self.items; callers hold the lock"""
+        if self.data_file.exists():
+            try:
+                shutil.copyfile(self.data_file, self.backup_file)
+            except Exception as e:
+                print(f"Warning: Could not create backup: {e}")
+
+        # Write to a temporary file first so a crash never leaves a half-written inventory
+        temp_file = self.data_file.with_suffix('.tmp')
+        with open(temp_file, 'w') as file:
+            # Written item by item, in the layout json.dump(indent=2) gives,
+            # rather than building a second copy of the inventory first
+            file.write('{')
+            separator = '\n'
+            for item_id, item_data in self.items.items():
+                record = json.dumps(item_to_record(item_data), indent=2).replace('\n', '\n  ')
+                file.write(f'{separator}  {json.dumps(item_id)}: {record}')
+                separator = ',\n'
+            file.write('\n}' if self.items else '}')
+            file.flush()
+            os.fsync(file.fileno())
+            self.stamp = file_stamp(os.fstat(file.fileno()))
+        os.replace(temp_file, self.data_file)
+        metrics.add_bytes("save_data", self.stamp[2])
+        self.write_cache(self.items)
+
+
+class JournalStore(StorageBackend):
+    """Append-only journal of inventory changes folded into a snapshot file
+
+    Each add/remove is written as a single JSON line instead of rewriting the
+    whole inventory. Once the journal holds compact_threshold records it is
+    rotated aside and merged into the snapshot on a background thread.
+    """
+    rewrites_all = False
+
+    def __init__(self, snapshot_file, compact_threshold=1000):
+        self.snapshot_file = Path(snapshot_file)
+        self.journal_file = self.snapshot_file.with_suffix('.journal')
+        self.rotated_file = self.snapshot_file.with_suffix('.journal.old')
+        self.compact_threshold = compact_threshold
+        self.record_count = 0
+        self.journal = None
+        self.compactor = None
+        self.lock = threading.Lock()
+
+    def read_snapshot(self):
+        """Read the raw records from the snapshot file"""
+        if self.snapshot_file.exists():
+            with open(self.snapshot_file, 'r') as file:
+                return json.load(file)
+        return {}
+
+    def replay(self, path, data):
+        """Apply the records of a journal file to data
+
+        Returns how many records were applied and the length of the file up
+        to the end of its last complete line, where a write torn by a crash
+        starts.
+        """
+        count = 0
+        end = 0
+        if not path.exists():
+            return count, end
+
+        with open(path, 'rb') as file:
+            for line in file:
+                if not line.endswith(b'\n'):
+                    # A torn write at the end of the journal after a crash
+                    break
+                end += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    print(f"Skipping unreadable record in {path.name}")
+                    continue
+
+                if record['op'] == 'add':
+                    data[record['id']] = record['item']
+                elif record['op'] == 'remove':
+                    data.pop(record['id'], None)
+                count += 1
+        return count, end
+
+    def load(self):
+        """Rebuild the inventory from the snapshot plus any journal records"""
+        # A compaction replaces the snapshot and then drops the rotated journal
+        self.wait_for_compaction()
+        with self.lock:
+            data = self.read_snapshot()
+            self.replay(self.rotated_file, data)
+            self.record_count, end = self.replay(self.journal_file, data)
+            if self.journal_file.exists() and self.journal_file.stat().st_size > end:
+                # Cut a torn write off, or the next record would be appended to it and lost
+                with open(self.journal_file, 'rb+') as file:
+                    file.truncate(end)
+        return {item_id: record_to_item(record) for item_id, record in data.items()}
+
+    def apply(self, changes, food_items):
+        """Append a list of (op, item_id, item_data) changes to the journal"""
+        with self.lock:
+            if self.journal is None:
+                self.journal = open(self.journal_file, 'a')
+
+            start = self.journal.tell()
+            for op, item_id, item_data in changes:
+                record = {'op': op, 'id': item_id}
+                if item_data is not None:
+                    record['item'] = item_to_record(item_data)
+                self.journal.write(json.dumps(record) + '\n')
+
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            metrics.add_bytes("save_data", self.journal.tell() - start)
+            self.record_count += len(changes)
+
+            if self.record_count >= self.compact_threshold:
+                self.start_compaction()
+
+    def start_compaction(self):
+        """Rotate the journal aside and compact it in the background (lock must be held)"""
+        if self.compactor is not None and self.compactor.is_alive():
+            return
+
+        # A rotated journal left behind by an interrupted compaction is
+        # folded in first; the live journal keeps growing until then.
+        if not self.rotated_file.exists():
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+            os.replace(self.journal_file, self.rotated_file)
+            self.record_count = 0
+
+        self.compactor = threading.Thread(target=self.compact, daemon=True)
+        self.compactor.start()
+
+    def compact(self):
+        """Fold the rotated journal into a fresh snapshot"""
+        try:
+            data = self.read_snapshot()
+            self.replay(self.rotated_file, data)
+            self.write_records(data)
+            os.remove(self.rotated_file)
+        except Exception as e:
+            print(f"Journal compaction failed: {e}")
+
+    def write_records(self, data):
+        """Atomically replace the snapshot file with the given raw records"""
+        temp_file = self.snapshot_file.with_suffix('.tmp')
+        with open(temp_file, 'w') as file:
+            json.dump(data, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, self.snapshot_file)
+
+    def save_all(self, food_items):
+        """Write the full inventory as a new snapshot and clear the journal"""
+        self.wait_for_compaction()
+        with self.lock:
+            self.write_records({item_id: item_to_record(item_data)
+                                for item_id, item_data in food_items.items()})
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+            for path in (self.journal_file, self.rotated_file):
+                if path.exists():
+                    os.remove(path)
+            self.record_count = 0
+
+    def wait_for_compaction(self):
+        """Block until a running background compaction has finished"""
+        compactor = self.compactor  # load() and the persistence thread may both wait
+        if compactor is not None:
+            compactor.join()
+            self.compactor = None
+
+    def close(self):
+        """Finish any pending compaction and close the journal file"""
+        self.wait_for_compaction()
+        with self.lock:
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+
+
+class SqliteStore(StorageBackend):
+    """Inventory kept in an SQLite database with indexed date columns
+
+    The connection is shared between the GUI thread and the persistence
+    worker, so every use of it holds self.lock. SQLite itself serializes
+    writers from several loggers, and PRAGMA data_version tells us when
+    another connection has committed since we last loaded.
+    """
+    rewrites_all = False
+
+    def __init__(self, db_file):
+        self.db_file = Path(db_file)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS food_items (
+                    item_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    category TEXT,
+                    quantity REAL,
+                    purchase_date TEXT,
+                    expiry_date TEXT
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_food_items_expiry ON food_items (expiry_date)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_food_items_purchase ON food_items (purchase_date)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_food_items_category ON food_items (category)")
+        self.data_version = None
+
+    def load(self):
+        food_items = {}
+        with self.lock:
+            self.data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            rows = self.conn.execute(
+                "SELECT item_id, name, category, quantity, purchase_date, expiry_date FROM food_items").fetchall()
+        for item_id, name, category, quantity, purchase_date, expiry_date in rows:
+            food_items[item_id] = record_to_item({
+                "name": name,
+                "category": category,
+                "quantity": quantity,
+                "purchase_date": purchase_date,
+                "expiry_date": expiry_date
+            })
+        return food_items
+
+    def row(self, item_id, item_data):
+        record = item_to_record(item_data)
+        return (item_id, record['name'], record.get('category'), record.get('quantity'),
+                record.get('purchase_date'), record.get('expiry_date'))
+
+    def save_all(self, food_items):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM food_items")
+            self.conn.executemany(
+                "INSERT INTO food_items VALUES (?, ?, ?, ?, ?, ?)",
+                (self.row(item_id, item_data) for item_id, item_data in food_items.items()))
+
+    def apply(self, changes, food_items):
+        with self.lock, self.conn:
+            for op, item_id, item_data in changes:
+                if op == "add":
+                    self.conn.execute("INSERT OR REPLACE INTO food_items VALUES (?, ?, ?, ?, ?, ?)",
+                                      self.row(item_id, item_data))
+                elif op == "remove":
+                    self.conn.execute("DELETE FROM food_items WHERE item_id = ?", (item_id,))
+
+    def changed_externally(self):
+        with self.lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0] != self.data_version
+
+    def watch_paths(self):
+        # Commits land in the write-ahead log first
+        return [self.db_file, self.db_file.with_name(self.db_file.name + "-wal")]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class PersistenceWorker:
+    """Runs storage writes on a background thread, merging saves that pile up
+
+    submit() only records what has to be written and returns at once. If
+    several saves arrive while a write is in progress they are combined:
+    backends that rewrite everything just write the newest inventory
+    snapshot, incremental backends get the queued changes in one call.
+    Errors are passed to on_error, which is called on the worker thread.
+    """
+
+    def __init__(self, storage, on_error):
+        self.storage = storage
+        self.on_error = on_error
+        self.pending_snapshot = None  # Inventory to write with save_all
+        self.pending_changes = []     # Changes to apply after the snapshot
+        self.busy = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="persistence", daemon=True)
+        self.thread.start()
+
+    def submit(self, changes, food_items):
+        """Queue a save of the given changes, or of everything when changes is None"""
+        with self.condition:
+            if changes is None or self.storage.rewrites_all:
+                # A shallow copy is enough: items are replaced, never edited in place
+                self.pending_snapshot = dict(food_items)
+                self.pending_changes = []
+            else:
+                self.pending_changes.extend(changes)
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.closed and self.pending_snapshot is None and not self.pending_changes:
+                    self.condition.wait()
+                if self.pending_snapshot is None and not self.pending_changes:
+                    return
+                snapshot, changes = self.pending_snapshot, self.pending_changes
+                self.pending_snapshot, self.pending_changes = None, []
+                self.busy = True
+
+            try:
+                with metrics.timer("save_data"):
+                    if snapshot is not None:
+                        self.storage.save_all(snapshot)
+                    if changes:
+                        self.storage.apply(changes, None)
+            except Exception as e:
+                error_msg = f"Could not save data: {e}"
+                print(error_msg)
+                self.on_error(error_msg)
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.condition.notify_all()
+
+    def flush(self):
+        """Block until everything submitted so far has been written"""
+        with self.condition:
+            while self.busy or self.pending_snapshot is not None or self.pending_changes:
+                self.condition.wait()
+
+    def close(self):
+        """Write what is still queued and stop the worker thread"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+
+def create_storage(storage_mode, app_dir):
+    """Create the storage backend for the given mode ("json", "journal" or "sqlite")"""
+    app_dir = Path(app_dir)
+    if storage_mode == "journal":
+        return JournalStore(app_dir / "food_inventory.json")
+    if storage_mode == "sqlite":
+        return SqliteStore(app_dir / "food_inventory.db")
+    return JsonStore(app_dir / "food_inventory.json")
@@ -0,0 +1,79 @@
+"""Streaming import and export of inventories as JSON Lines or CSV
+
+Both formats hold one item per line (an optional "id" followed by the
+FoodItem fields), so files of any size are read and written one item at a
+time through generators instead of being parsed or built whole in memory.
+"""
+import csv
+import json
+import os
+from pathlib import Path
+
+from food_item import FoodItem
+
+FORMATS = (".jsonl", ".csv")
+CSV_COLUMNS = ["id", "name", "category", "quantity", "purchase_date", "expiry_date"]
+PROGRESS_EVERY = 1000  # Items between progress reports
+
+
+def transfer_format(path):
+    """Return ".jsonl" or ".csv" depending on the suffix of path"""
+    suffix = Path(path).suffix.lower()
+    if suffix not in FORMATS:
+        raise ValueError(f"Unsupported inventory file type: {suffix or path}")
+    return suffix
+
+
+def read_lines(path, progress=None):
+    """Yield the decoded lines of path, reporting (bytes read, total bytes) to progress"""
+    total = os.path.getsize(path)
+    done = 0
+    with open(path, 'rb') as file:
+        for count, line in enumerate(file, 1):
+            done += len(line)
+            # Spreadsheet exports often start with a byte order mark
+            yield line.decode('utf-8-sig' if count == 1 else 'utf-8')
+            if progress is not None and count % PROGRESS_EVERY == 0:
+                progress(done, total)
+    if progress is not None:
+        progress(total, total)
+
+
+def read_items(path, progress=None):
+    """Yield (item_id or None, FoodItem) for every item in a .jsonl or .csv file"""
+    if transfer_format(path) == ".jsonl":
+        for line in read_lines(path, progress):
+            if line.strip():
+                record = json.loads(line)
+                yield record.get('id'), FoodItem.from_record(record)
+    else:
+        for row in csv.DictReader(read_lines(path, progress)):
+            row['quantity'] = float(row.get('quantity') or 0)
+            yield row.get('id') or None, FoodItem.from_record(row)
+
+
+def write_items(path, items, total, progress=None):
+    """Write (item_id, item_data) pairs to a .jsonl or .csv file
+
+    total is the number of items, used only for progress reports. The file
+    is replaced in one step once everything has been written.
+    """
+    file_format = transfer_format(path)
+    path = Path(path)
+    temp_file = path.with_name(path.name + '.tmp')
+    with open(temp_file, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file) if file_format == ".csv" else None
+        if writer is not None:
+            writer.writerow(CSV_COLUMNS)
+
+        for count, (item_id, item_data) in enumerate(items, 1):
+            record = item_data.to_record()
+            if writer is not None:
+                writer.writerow([item_id] + [record[column] for column in CSV_COLUMNS[1:]])
+            else:
+                file.write(json.dumps(dict(id=item_id, **record)) + '\n')
+            if progress is not None and count % PROGRESS_EVERY == 0:
+                progress(count, total)
+    os.replace(temp_file, path)
+    if progress is not None:
+        progress(total, total)
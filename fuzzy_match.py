@@ -0,0 +1,136 @@
+"""Fuzzy matching of inventory names against recipe ingredients
+
+Names are normalized once into word stems ("Cherry Tomatoes" -> ("cherry",
+"tomato")), so plurals and word order stop mattering. A name matches an
+ingredient when one of its stems is within a small edit distance of one of
+the ingredient's stems, which also forgives typos like "tomatoe".
+
+Edit distance is too slow to try on every pair, so candidates are first
+pruned with a trigram index over the ingredient stems. The pairs left are
+scored in chunks, in a process pool once there are enough of them, and
+results are yielded chunk by chunk so callers can show the best matches
+before scoring finishes.
+"""
+import re
+from concurrent.futures import FIRST_COMPLETED, wait
+
+MIN_SIMILARITY = 0.8   # 1 - edit distance / length of the longer stem
+MIN_SHARED_GRAMS = 0.4  # Share of a stem's trigrams a candidate must have
+CHUNK_SIZE = 2000       # Pairs scored per chunk
+STOP_WORDS = {"and", "of", "the", "with", "fresh", "for"}
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+
+def stem(word):
+    """Strip common English plural endings: tomatoes -> tomato, berries -> berry, eggs -> egg"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+
+def normalize(name):
+    """Return the stems of the meaningful words of name, in order"""
+    return tuple(stem(word) for word in WORD_PATTERN.findall(name.lower())
+                 if len(word) >= 3 and word not in STOP_WORDS)
+
+
+def stem_grams(word):
+    """Trigrams of a stem padded with spaces, so short stems still have some"""
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """1 minus the edit distance of a and b over the length of the longer one"""
+    if a == b:
+        return 1.0
+    longer = max(len(a), len(b))
+    limit = longer * (1 - MIN_SIMILARITY) + 1e-9  # Most edits that can still reach MIN_SIMILARITY
+    if abs(len(a) - len(b)) > limit:
+        return 0.0
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return 0.0  # The distance can only grow from here
+        previous = current
+    return 1 - previous[-1] / longer
+
+
+def score_chunk(pairs):
+    """Return the (name, ingredient) pairs whose stems match; runs in worker processes
+
+    pairs is a list of (name, name stems, ingredient, ingredient stems).
+    """
+    return [(name, ingredient) for name, name_stems, ingredient, ingredient_stems in pairs
+            if any(similarity(a, b) >= MIN_SIMILARITY for a in name_stems for b in ingredient_stems)]
+
+
+class FuzzyIndex:
+    """Normalized recipe ingredients with a trigram index over their stems"""
+
+    def __init__(self, ingredients):
+        self.stems = {}  # ingredient -> its stems
+        self.grams = {}  # trigram -> ingredients with a stem containing it
+        for ingredient in ingredients:
+            stems = normalize(ingredient)
+            self.stems[ingredient] = stems
+            for word in stems:
+                for gram in stem_grams(word):
+                    self.grams.setdefault(gram, set()).add(ingredient)
+
+    def candidates(self, stems):
+        """Return the ingredients sharing enough trigrams with any of the stems"""
+        found = set()
+        for word in stems:
+            grams = stem_grams(word)
+            counts = {}
+            for gram in grams:
+                for ingredient in self.grams.get(gram, ()):
+                    counts[ingredient] = counts.get(ingredient, 0) + 1
+            needed = max(1, int(len(grams) * MIN_SHARED_GRAMS))
+            found.update(ingredient for ingredient, count in counts.items() if count >= needed)
+        return found
+
+    def pairs(self, names):
+        """Return the (name, name stems, ingredient, ingredient stems) pairs worth scoring"""
+        pairs = []
+        for name in dict.fromkeys(names):
+            stems = normalize(name)
+            for ingredient in self.candidates(stems):
+                pairs.append((name, stems, ingredient, self.stems[ingredient]))
+        return pairs
+
+    def match_stream(self, names, pool=None, parallel_threshold=20000, cancelled=None):
+        """Yield lists of matching (name, ingredient) pairs, one per scored chunk
+
+        Chunks go to pool (a concurrent.futures executor) when there are at
+        least parallel_threshold pairs, otherwise they are scored here.
+        Scoring stops early once cancelled (a threading.Event) is set.
+        """
+        pairs = self.pairs(names)
+        chunks = [pairs[i:i + CHUNK_SIZE] for i in range(0, len(pairs), CHUNK_SIZE)]
+        if pool is None or len(pairs) < parallel_threshold:
+            for chunk in chunks:
+                if cancelled is not None and cancelled.is_set():
+                    return
+                yield score_chunk(chunk)
+            return
+
+        pending = {pool.submit(score_chunk, chunk) for chunk in chunks}
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                if cancelled is not None and cancelled.is_set():
+                    return
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
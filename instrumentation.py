@@ -0,0 +1,217 @@
+"""Timing counters and profiling capture for the Food Waste Logger hot paths
+
+Instrumented operations record their call count, errors, a latency
+histogram and the bytes they wrote in the process-wide metrics registry:
+
+    @timed("match_recipes")
+    def match_recipes(self, ...):
+
+metrics.snapshot() returns everything as a JSON friendly dict. Setting
+FOOD_LOGGER_PROFILE to "cprofile", "tracemalloc" or "all" also profiles the
+session; the results are written to the data directory on close. cProfile
+follows the thread that started the capture and every thread started after
+it, such as the persistence worker and the GUI's loader, but not threads
+already running or the fuzzy matching processes.
+"""
+import functools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_ENV = "FOOD_LOGGER_PROFILE"
+
+
+class Histogram:
+    """Latency histogram with buckets a quarter octave wide, about 19% apart"""
+
+    def __init__(self):
+        self.buckets = {}  # bucket number -> count
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        micros = seconds * 1e6
+        bucket = int(math.log2(micros) * 4) if micros > 1 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Upper bound in milliseconds of the bucket holding the given fraction of calls"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return min(2 ** ((bucket + 1) / 4) / 1000, self.max * 1000)
+        return self.max * 1000
+
+
+class OperationStats:
+    """Counters kept for one instrumented operation"""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.bytes_written = 0
+
+    def summary(self):
+        latency = self.latency
+        return {
+            "calls": latency.count,
+            "errors": self.errors,
+            "mean_ms": latency.total / latency.count * 1000 if latency.count else 0.0,
+            "p50_ms": latency.percentile(0.5),
+            "p99_ms": latency.percentile(0.99),
+            "max_ms": latency.max * 1000,
+            "total_ms": latency.total * 1000,
+            "bytes_written": self.bytes_written
+        }
+
+
+class Metrics:
+    """Registry of operation stats, safe to update from any thread"""
+
+    def __init__(self):
+        self.operations = {}
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def stats(self, name):
+        if name not in self.operations:
+            self.operations[name] = OperationStats()
+        return self.operations[name]
+
+    def record(self, name, seconds, failed=False):
+        with self.lock:
+            stats = self.stats(name)
+            stats.latency.add(seconds)
+            if failed:
+                stats.errors += 1
+
+    def add_bytes(self, name, count):
+        with self.lock:
+            self.stats(name).bytes_written += count
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block as one call of operation name"""
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.record(name, time.perf_counter() - start, failed)
+
+    def snapshot(self):
+        with self.lock:
+            operations = {name: stats.summary() for name, stats in sorted(self.operations.items())}
+        return {"since": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                "operations": operations}
+
+    def dump(self, path):
+        """Write snapshot() to path as JSON"""
+        with open(path, 'w') as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+    def reset(self):
+        with self.lock:
+            self.operations = {}
+            self.started = time.time()
+
+
+metrics = Metrics()
+
+
+def timed(name):
+    """Decorator recording every call of the function as operation name"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class ProfileCapture:
+    """cProfile and/or tracemalloc capture for a whole session, chosen by FOOD_LOGGER_PROFILE"""
+
+    def __init__(self):
+        self.profiler = None
+        self.thread_profilers = []  # One per thread started while capturing
+        self.tracing = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        mode = os.environ.get(PROFILE_ENV, "").lower()
+        if not mode or self.profiler is not None or self.tracing:
+            return
+        if mode not in ("cprofile", "tracemalloc", "all"):
+            print(f"Ignoring unknown {PROFILE_ENV} value: {mode}")
+            return
+        if mode in ("cprofile", "all"):
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            threading.setprofile(self.profile_thread)
+        if mode in ("tracemalloc", "all"):
+            import tracemalloc
+            tracemalloc.start(25)
+            self.tracing = True
+        print(f"Profiling this session ({PROFILE_ENV}={mode})")
+
+    def profile_thread(self, frame, event, arg):
+        """threading.setprofile hook giving each new thread a profiler of its own"""
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()  # Replaces this hook for the rest of the thread
+        except ValueError:
+            # From Python 3.12 one profiler already sees every thread
+            sys.setprofile(None)
+            return
+        with self.lock:
+            self.thread_profilers.append(profiler)
+
+    def stop(self, out_dir):
+        """Stop capturing and write the results and the metrics into out_dir"""
+        if self.profiler is None and not self.tracing:
+            return
+        if self.profiler is not None:
+            import pstats
+            threading.setprofile(None)
+            self.profiler.disable()
+            stats = pstats.Stats(self.profiler)
+            with self.lock:
+                for profiler in self.thread_profilers:
+                    profiler.disable()
+                    stats.add(profiler)
+                self.thread_profilers = []
+            stats.dump_stats(os.path.join(out_dir, "profile.pstats"))
+            self.profiler = None
+        if self.tracing:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            self.tracing = False
+            with open(os.path.join(out_dir, "tracemalloc.txt"), 'w') as file:
+                for stat in snapshot.statistics('traceback')[:50]:
+                    file.write(f"{stat}\n")
+                    for line in stat.traceback.format():
+                        file.write(f"{line}\n")
+                    file.write("\n")
+        metrics.dump(os.path.join(out_dir, "metrics.json"))
+        print(f"Profiling results written to {out_dir}")
+
+
+capture = ProfileCapture()
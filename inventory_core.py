@@ -0,0 +1,799 @@
+"""Inventory engine of the Food Waste Logger, usable without any GUI"""
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from food_item import ITEM_ID_PATTERN, FoodItem, ItemIdGenerator, migrate_legacy_ids
+from food_analytics import AnalyticsEngine, np
+from food_history import REMOVAL_REASONS, EventLog, make_event
+from food_index import ExpiryIndex, ProductIndex, RecipeIndex, SearchIndex
+from food_storage import JsonStore, PersistenceWorker, create_storage
+from food_transfer import read_items, write_items
+from fuzzy_match import FuzzyIndex
+from instrumentation import capture, timed
+from meal_planner import plan_meals
+from product_catalog import ProductCatalog
+from recipe_store import BuiltinRecipeStore, open_recipe_store
+
+
+class InventoryCore:
+    """Food inventory with persistence, expiry queries, recipe matching and reports
+    
+    This class has no Qt dependency so it can be driven by scripts and batch
+    jobs; FoodWasteLogger builds the window on top of it.
+    """
+    
+    def __init__(self, storage_mode="json", app_dir=None, load=True):
+        capture.start()  # Only profiles when FOOD_LOGGER_PROFILE is set
+        self.storage_mode = storage_mode  # "json", "journal" or "sqlite", see food_storage.create_storage
+        self.food_items = {}  # Dictionary to store all food items
+        self.item_ids = ItemIdGenerator()
+        self.load_error = None  # Message of the last failed load, shown by front ends
+        self.expiry_index = ExpiryIndex()  # Item ids sorted by expiry date
+        self.search_index = SearchIndex()  # Item ids by name and category words
+        self.product_index = ProductIndex()  # Items as dated lots of (name, category) products
+        self.inventory_version = 0  # Bumped on every change, keys the recipe match cache
+        self.recipe_matches = {}
+        self.fuzzy_matches = {}  # Complete fuzzy rankings, keyed like recipe_matches
+        self.fuzzy_pool = None  # Process pool for fuzzy recipe matching, see match_pool
+        self.fuzzy_pool_lock = threading.Lock()  # Streams on several threads may start it
+        self.batch_changes = None  # Pending (op, item_id, item_data) changes while a batch is open
+        self.batch_undo = None     # (item_id, previous item_data) pairs to roll a batch back
+        self.batch_events = None   # History events waiting for the batch to commit
+        self.bulk_reindex_threshold = 1000  # Merges larger than this rebuild the expiry index
+        self.food_categories = {
+            "Dairy": 7,      # Default shelf life in days
+            "Meat": 4,
+            "Vegetables": 7,
+            "Fruits": 7,
+            "Bakery": 5,
+            "Pantry": 180
+        }
+        # Days before expiry at which items count as expiring soon; overridden
+        # per category by expiry_alerts.json in the data directory
+        self.default_alert_days = 3
+        self.expiry_alert_days = dict.fromkeys(self.food_categories, self.default_alert_days)
+        
+        # Built-in recipes, used when there is no recipes.jsonl/recipes.db library
+        self.recipes = [
+            {
+                "name": "Vegetable Stir Fry",
+                "ingredients": ["Carrot", "Broccoli", "Rice"],
+                "instructions": "1. Chop vegetables into bite-sized pieces.\n2. Cook rice according to package instructions.\n3. Heat oil in a pan and stir fry vegetables for 5-7 minutes.\n4. Season with salt and pepper.\n5. Serve vegetables over rice."
+            },
+            {
+                "name": "Chicken Salad",
+                "ingredients": ["Chicken", "Tomato", "Spinach"],
+                "instructions": "1. Cook chicken until no longer pink inside.\n2. Chop tomatoes and prepare spinach leaves.\n3. Combine all ingredients in a bowl.\n4. Add your favorite dressing and toss to coat."
+            },
+            {
+                "name": "Fruit Smoothie",
+                "ingredients": ["Banana", "Yogurt", "Milk"],
+                "instructions": "1. Cut banana into chunks.\n2. Add banana, yogurt and milk to a blender.\n3. Blend until smooth.\n4. Pour into a glass and enjoy immediately."
+            },
+            {
+                "name": "Simple Pasta",
+                "ingredients": ["Pasta", "Tomato", "Cheese"],
+                "instructions": "1. Cook pasta according to package instructions.\n2. While pasta cooks, dice tomatoes.\n3. Drain pasta and return to pot.\n4. Add tomatoes and grated cheese, stir until cheese melts."
+            },
+            {
+                "name": "Quick Omelet",
+                "ingredients": ["Eggs", "Cheese", "Spinach"],
+                "instructions": "1. Beat eggs in a bowl.\n2. Heat butter in a pan over medium heat.\n3. Pour in eggs and cook until almost set.\n4. Add cheese and spinach to one half, fold over the other half.\n5. Cook until cheese melts."
+            }
+        ]
+        
+        self.recipe_store = None  # Library the recipes come from, opened by load_recipes
+        
+        self.setup_data_storage(app_dir)
+        self.load_alert_settings()
+        # Front ends that show a window first pass load=False and call
+        # load_recipes() and read_inventory() on a worker thread, then
+        # install_inventory() on their own thread
+        if load:
+            self.load_recipes()
+            self.load_data()
+
+    def setup_data_storage(self, app_dir=None):
+        """Setup appropriate directories for data storage"""
+        if app_dir is None:
+            app_dir = Path.home() / "FoodWasteLogger"
+        
+        self.app_dir = Path(app_dir)
+        try:
+            self.app_dir.mkdir(exist_ok=True)
+        except Exception as e:
+            print(f"Could not create directory in home folder: {e}")
+            self.app_dir = Path.cwd()
+        
+        self.data_file = self.app_dir / "food_inventory.json"
+        print(f"Data will be stored at: {self.data_file}")
+        
+        self.storage = create_storage(self.storage_mode, self.app_dir)
+        self.persistence = PersistenceWorker(self.storage, self.save_failed)
+        self.history = EventLog(self.app_dir / "food_history.jsonl")
+        self.catalog = ProductCatalog(self.app_dir / "products.db")  # Barcode -> product, for scanning
+        # Vectorized reports when NumPy is installed, see food_analytics
+        self.analytics = AnalyticsEngine(self.history.history_file) if np is not None else None
+
+    def load_alert_settings(self):
+        """Read per-category expiry alert thresholds, e.g. {"Meat": 1, "Pantry": 14}"""
+        settings_file = self.app_dir / "expiry_alerts.json"
+        if not settings_file.exists():
+            return
+        try:
+            with open(settings_file, 'r') as file:
+                settings = json.load(file)
+            for category, days in settings.items():
+                self.expiry_alert_days[category] = max(0, int(days))
+        except Exception as e:
+            print(f"Error loading expiry alert settings: {e}")
+
+    def alert_days(self, category):
+        """Days before expiry at which items of category count as expiring soon"""
+        return self.expiry_alert_days.get(category, self.default_alert_days)
+
+    def load_recipes(self):
+        """Load the recipe library and build its ingredient index"""
+        try:
+            self.recipe_store = open_recipe_store(self.app_dir, self.recipes)
+        except Exception as e:
+            print(f"Error loading recipe library: {e}")
+            self.recipe_store = BuiltinRecipeStore(self.recipes)
+        
+        self.recipes = self.recipe_store.recipes
+        self.recipe_index = RecipeIndex(self.recipes)
+        self.fuzzy_index = FuzzyIndex(self.recipe_index.ingredient_recipes)
+        self.recipe_matches.clear()
+        self.fuzzy_matches.clear()
+        print(f"Loaded {len(self.recipes)} recipes")
+
+    def load_data(self):
+        """Load existing food inventory data from file with improved error handling"""
+        self.install_inventory(self.read_inventory())
+
+    @timed("load_data")
+    def read_inventory(self):
+        """Read the stored inventory and history without touching the live inventory
+        
+        Safe to call from a worker thread. Returns (food_items, error message).
+        """
+        self.persistence.flush()
+        try:
+            food_items, error = self.storage.load(), None
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            food_items, error = {}, str(e)
+        
+        try:
+            self.history.load()
+        except Exception as e:
+            print(f"Error loading history: {e}")
+        return food_items, error
+
+    @timed("install_inventory")
+    def install_inventory(self, loaded):
+        """Make items returned by read_inventory() the live inventory"""
+        self.food_items, error = loaded
+        if error:
+            self.load_error = error
+        
+        migrated = migrate_legacy_ids(self.food_items)
+        if migrated is not None:
+            print("Migrating legacy item ids to the new id format")
+            self.food_items = migrated
+            self.save_data()
+        self.rebuild_indexes()
+
+    @timed("reload_changes")
+    def reload_changes(self):
+        """Pick up items other loggers sharing the storage added, changed or removed
+        
+        Only the items that differ are replaced, reindexed and refreshed.
+        Returns their ids.
+        """
+        # Checked before waiting on the persistence thread: most calls come
+        # from timers and file notifications, often for our own saves
+        if self.batch_changes is not None or not self.storage.changed_externally():
+            return []
+        # Our own queued changes must reach the storage first, or they would look like deletions
+        self.persistence.flush()
+        try:
+            stored = self.storage.load()
+        except Exception as e:
+            print(f"Error reloading data: {e}")
+            return []
+        
+        changed = [item_id for item_id, item_data in stored.items()
+                   if self.food_items.get(item_id) != item_data]
+        changed.extend(item_id for item_id in self.food_items if item_id not in stored)
+        for item_id in changed:
+            if item_id in stored:
+                self.food_items[item_id] = stored[item_id]
+            else:
+                del self.food_items[item_id]
+        if len(changed) > self.bulk_reindex_threshold:
+            self.rebuild_indexes()
+        else:
+            for item_id in changed:
+                self.reindex_item(item_id)
+        
+        if changed:
+            self.refresh_items(changed)
+        return changed
+
+    def save_data(self, changes=None):
+        """Queue the current food inventory to be saved in the background
+        
+        changes is an optional list of (op, item_id, item_data) tuples that
+        lets incremental backends persist only what changed. Failures are
+        reported through save_failed.
+        """
+        self.persistence.submit(changes, self.food_items)
+
+    def save_failed(self, error_msg):
+        """Called when saving fails; front ends override this to alert the user
+        
+        This may run on the persistence thread.
+        """
+
+    def export_json(self, path):
+        """Export the inventory to a JSON file in the default storage format"""
+        JsonStore(path, shared=False).save_all(self.food_items)
+
+    def import_json(self, path):
+        """Merge the items of a JSON inventory file into the current inventory"""
+        return len(self.merge_items(JsonStore(path, shared=False).load().items()))
+
+    @timed("export_items")
+    def export_items(self, path, progress=None):
+        """Stream the inventory to a .jsonl or .csv file
+        
+        progress, if given, is called with (items written, total items).
+        """
+        write_items(path, self.food_items.items(), len(self.food_items), progress)
+
+    @timed("import_items")
+    def import_items(self, path, progress=None):
+        """Stream the items of a .jsonl or .csv file, e.g. a supplier manifest, into the inventory
+        
+        progress, if given, is called with (bytes read, total bytes). If the
+        file turns out to be malformed part way, nothing is imported.
+        Returns the number of items merged.
+        """
+        return len(self.merge_items(read_items(path, progress)))
+
+    def merge_items(self, items):
+        """Merge (item_id, item_data) pairs into the inventory as one batch
+        
+        An id already in the inventory replaces that item. Missing and legacy
+        ids, which could clash with ours, get a new id. Items new to the
+        inventory are recorded as added in the history. Returns the merged ids.
+        """
+        merged = []
+        now = datetime.now()
+        with self.batch():
+            for item_id, item_data in items:
+                if not isinstance(item_id, str) or not ITEM_ID_PATTERN.fullmatch(item_id):
+                    item_id = self.item_ids.next_id()
+                previous = self.food_items.get(item_id)
+                self.batch_undo.append((item_id, previous))
+                self.food_items[item_id] = item_data
+                self.batch_changes.append(("add", item_id, item_data))
+                if previous is None:
+                    self.batch_events.append(make_event("added", item_id, item_data, now))
+                merged.append(item_id)
+            
+            if len(merged) > self.bulk_reindex_threshold:
+                # One sort beats inserting every item into the index separately
+                self.rebuild_indexes()
+            else:
+                for item_id in merged:
+                    self.reindex_item(item_id)
+        return merged
+
+    def add_food_item(self, name, category, quantity, purchase_date=None, expiry_date=None):
+        """Add a new food item to the inventory"""
+        if not purchase_date:
+            purchase_date = datetime.now().date()
+            
+        if not expiry_date:
+            shelf_life = self.food_categories.get(category, 7)
+            expiry_date = purchase_date + timedelta(days=shelf_life)
+        
+        item_id = self.item_ids.next_id()
+        
+        previous = self.food_items.get(item_id)
+        self.food_items[item_id] = FoodItem(name, category, quantity, purchase_date, expiry_date)
+        
+        self.item_changed("add", item_id, previous, "added")
+        return item_id
+
+    def remove_food_item(self, item_id, reason="consumed"):
+        """Remove a food item from the inventory
+        
+        reason is recorded in the history: "consumed", "discarded" or "expired".
+        """
+        if reason not in REMOVAL_REASONS:
+            raise ValueError(f"Unknown removal reason: {reason}")
+        
+        if item_id in self.food_items:
+            previous = self.food_items.pop(item_id)
+            self.item_changed("remove", item_id, previous, reason)
+            return True
+        return False
+
+    def add_food_items(self, items):
+        """Add several food items with a single save and table refresh
+        
+        items is an iterable of dicts holding the add_food_item arguments.
+        Returns the list of new item ids.
+        """
+        with self.batch():
+            return [self.add_food_item(**item) for item in items]
+
+    def remove_food_items(self, item_ids, reason="consumed"):
+        """Remove several food items with a single save and table refresh"""
+        with self.batch():
+            return sum(1 for item_id in item_ids if self.remove_food_item(item_id, reason))
+
+    def scanned_item(self, product, quantity=1, purchase_date=None):
+        """Return add_food_item arguments for a scanned catalog product"""
+        if not purchase_date:
+            purchase_date = datetime.now().date()
+        expiry_date = None  # The category's shelf life
+        if product.shelf_life_days is not None:
+            expiry_date = purchase_date + timedelta(days=product.shelf_life_days)
+        return {"name": product.name, "category": product.category, "quantity": quantity,
+                "purchase_date": purchase_date, "expiry_date": expiry_date}
+
+    def add_scanned_items(self, barcodes, purchase_date=None):
+        """Add the products of a run of scans with a single save and table refresh
+        
+        Repeated scans of one barcode become one item with that quantity.
+        Returns (new item ids, barcodes missing from the catalog).
+        """
+        counts = {}
+        for barcode in barcodes:
+            counts[barcode] = counts.get(barcode, 0) + 1
+        
+        items = []
+        unknown = []
+        for barcode, count in counts.items():
+            product = self.catalog.lookup(barcode)
+            if product is None:
+                unknown.append(barcode)
+            else:
+                items.append(self.scanned_item(product, count, purchase_date))
+        return self.add_food_items(items), unknown
+
+    def product_lots(self, name, category):
+        """Return the item ids holding a product, earliest expiry first"""
+        return self.product_index.lot_ids((name, category))
+
+    def consume_product(self, name, category, quantity, reason="consumed"):
+        """Take quantity of a product from its lots, earliest expiring first
+        
+        Lots used up are removed and the last one touched keeps what is left
+        of it, recorded as a "used" event since the item itself is still
+        there. Returns the quantity actually taken, less than asked for if
+        the product ran out.
+        """
+        if reason not in REMOVAL_REASONS:
+            raise ValueError(f"Unknown removal reason: {reason}")
+        
+        taken = 0
+        with self.batch():
+            for item_id in self.product_lots(name, category):
+                remaining = quantity - taken
+                if remaining <= 0:
+                    break
+                lot = self.food_items[item_id]
+                if (lot.quantity or 0) <= remaining:
+                    taken += lot.quantity or 0
+                    self.remove_food_item(item_id, reason)
+                else:
+                    self.food_items[item_id] = FoodItem(lot.name, lot.category, lot.quantity - remaining,
+                                                        lot.purchase_date, lot.expiry_date)
+                    self.item_changed("add", item_id, lot, "used", remaining)
+                    taken = quantity
+        return taken
+
+    def item_changed(self, op, item_id, previous, event_type, quantity=None):
+        """Persist and display a single change, or queue it while a batch is open
+        
+        quantity overrides the quantity recorded in the history, for an item
+        that was only partly used up.
+        """
+        item_data = self.food_items[item_id] if op == "add" else None
+        event = make_event(event_type, item_id, item_data or previous)
+        if quantity is not None:
+            event['quantity'] = quantity
+        self.reindex_item(item_id)
+        
+        if self.batch_changes is not None:
+            self.batch_changes.append((op, item_id, item_data))
+            self.batch_undo.append((item_id, previous))
+            self.batch_events.append(event)
+            return
+        
+        self.save_data([(op, item_id, item_data)])
+        self.record_events([event])
+        self.refresh_items([item_id])
+
+    @timed("record_events")
+    def record_events(self, events):
+        """Append events to the history log"""
+        try:
+            self.history.append(events)
+        except Exception as e:
+            error_msg = f"Could not record history: {e}"
+            print(error_msg)
+            self.save_failed(error_msg)
+
+    def reindex_item(self, item_id):
+        """Bring the in-memory indexes up to date for one item"""
+        self.inventory_version += 1
+        item_data = self.food_items.get(item_id)
+        if item_data is None:
+            self.expiry_index.discard(item_id)
+            self.search_index.discard(item_id)
+            self.product_index.discard(item_id)
+        else:
+            self.expiry_index.add(item_id, item_data['expiry_date'])
+            self.search_index.add(item_id, item_data.name, item_data.category)
+            self.product_index.add(item_id, item_data)
+
+    def rebuild_indexes(self):
+        """Rebuild the in-memory indexes from scratch after many items changed"""
+        self.inventory_version += 1
+        self.expiry_index.rebuild(self.food_items)
+        self.search_index.rebuild(self.food_items)
+        self.product_index.rebuild(self.food_items)
+
+    def search_items(self, query):
+        """Return the ids of the items whose name or category match query, see SearchIndex"""
+        return self.search_index.search(query)
+
+    def refresh_items(self, item_ids):
+        """Called after items change so front ends can update their views"""
+
+    @contextmanager
+    def batch(self):
+        """Defer saving and table refreshes until the block finishes
+        
+        Everything is written once on a clean exit; if an exception escapes,
+        the inventory is rolled back to its state before the batch.
+        """
+        if self.batch_changes is not None:
+            # Nested batches simply join the outer one
+            yield
+            return
+        
+        self.batch_changes = []
+        self.batch_undo = []
+        self.batch_events = []
+        try:
+            yield
+        except BaseException:
+            for item_id, previous in reversed(self.batch_undo):
+                if previous is None:
+                    self.food_items.pop(item_id, None)
+                else:
+                    self.food_items[item_id] = previous
+                self.reindex_item(item_id)
+            raise
+        else:
+            changes = self.batch_changes
+            events = self.batch_events
+        finally:
+            self.batch_changes = None
+            self.batch_undo = None
+            self.batch_events = None
+        
+        if changes:
+            self.save_data(changes)
+            self.record_events(events)
+            self.refresh_items({item_id for _, item_id, _ in changes})
+
+    @timed("get_expiring_soon")
+    def get_expiring_soon(self, days=None):
+        """Get a list of products expiring within the specified number of days
+        
+        Without days, each item's category alert threshold is used. A product
+        is listed once, with its soonest expiring lot.
+        """
+        today = datetime.now().date()
+        return self.product_days_left(self.expiring_soon_ids(today, days), today)
+
+    def product_days_left(self, item_ids, today):
+        """(name, days left) of the first lot of each product among item_ids"""
+        today_ordinal = today.toordinal()
+        products = set()
+        listed = []
+        
+        for item_id in item_ids:
+            item_data = self.food_items[item_id]
+            product = (item_data.name, item_data.category)
+            if product not in products:
+                products.add(product)
+                listed.append((item_data.name, item_data.expiry_ordinal - today_ordinal))
+                
+        return listed
+
+    def expiring_soon_ids(self, today, days=None):
+        """Ids of the items expiring soon on the given day, soonest first"""
+        if days is not None:
+            return self.expiry_index.between(today, today + timedelta(days=days))
+        
+        today_ordinal = today.toordinal()
+        expiring_soon = []
+        for item_id in self.expiry_index.between(today, today + timedelta(days=self.max_alert_days())):
+            item_data = self.food_items[item_id]
+            if item_data.expiry_ordinal - today_ordinal <= self.alert_days(item_data.category):
+                expiring_soon.append(item_id)
+        return expiring_soon
+
+    def max_alert_days(self):
+        return max(self.default_alert_days, *self.expiry_alert_days.values())
+
+    def status_changes(self, since, today):
+        """Return the ids of items whose expiry status changed after since, up to today
+        
+        Status only changes at midnight: an item starts expiring soon
+        alert_days before its expiry date and is expired the day after it.
+        Both moments are ranges of the expiry index, so only the items
+        concerned are looked at. Returns (newly expiring soon, newly expired).
+        """
+        since_ordinal = since.toordinal()
+        today_ordinal = today.toordinal()
+        low = min(self.default_alert_days, *self.expiry_alert_days.values())
+        
+        expiring = []
+        for item_id in self.expiry_index.between(since + timedelta(days=low + 1),
+                                                 today + timedelta(days=self.max_alert_days())):
+            item_data = self.food_items[item_id]
+            alert_start = item_data.expiry_ordinal - self.alert_days(item_data.category)
+            if since_ordinal < alert_start <= today_ordinal:
+                expiring.append(item_id)
+        
+        expired = self.expiry_index.between(since, today - timedelta(days=1))
+        return expiring, expired
+
+    def get_expired(self):
+        """Get a list of products with lots already past their expiry date, once per product"""
+        today = datetime.now().date()
+        return self.product_days_left(self.expiry_index.between(None, today - timedelta(days=1)), today)
+
+    @timed("match_recipes")
+    def match_recipes(self, ingredient_list=None):
+        """Return recipe matches for the given ingredients, or the whole inventory
+        
+        Results are cached per inventory version so repeated clicks without
+        inventory changes are free.
+        """
+        key = self.recipe_match_key(ingredient_list)
+        if key not in self.recipe_matches:
+            if ingredient_list is None:
+                ingredient_list = [item['name'] for item in self.food_items.values()]
+            if len(self.recipe_matches) >= 32:
+                self.recipe_matches.clear()
+            self.recipe_matches[key] = self.recipe_index.match(ingredient_list)
+        return self.recipe_matches[key]
+
+    def recipe_match_key(self, ingredient_list):
+        """Cache key of the recipe matches for ingredient_list, None meaning the whole inventory"""
+        if ingredient_list is None:
+            return ("inventory", self.inventory_version)
+        return ("list", tuple(ingredient_list))
+
+    @timed("plan_meals")
+    def plan_meals(self, days=3, meals_per_day=1):
+        """Plan meals for the next days that use up the products expiring soonest, see meal_planner
+        
+        The lots considered are the ones get_expiring_soon reports plus any
+        that expire before the plan ends, each with its own days left so a
+        fresh lot is not planned as if it went off with the oldest one.
+        """
+        today = datetime.now().date()
+        today_ordinal = today.toordinal()
+        item_ids = self.expiring_soon_ids(today) + self.expiry_index.between(today, today + timedelta(days=days - 1))
+        
+        lots = []
+        for item_id in dict.fromkeys(item_ids):
+            item_data = self.food_items[item_id]
+            lots.append((item_data.name, item_data.category, item_data.quantity or 0,
+                         item_data.expiry_ordinal - today_ordinal))
+        
+        return plan_meals(lots, self.recipe_index, days, meals_per_day)
+
+    def fuzzy_recipe_matches(self, ingredient_list=None, cancelled=None, interval=0.25):
+        """Yield recipe matches that improve as fuzzy ingredient matching proceeds
+        
+        The first list yielded holds the exact matches of match_recipes.
+        Ingredients found by the scored chunks are folded in and a new
+        ranking follows at most every interval seconds, with a final one
+        once scoring finishes, so the last list yielded is complete. Set
+        cancelled (a threading.Event) to stop early.
+        
+        Complete rankings are cached per inventory version like
+        match_recipes, and a cached one is yielded on its own. The
+        inventory is only read before the first list is yielded, so the
+        rest of the stream may be consumed on another thread.
+        """
+        key = self.recipe_match_key(ingredient_list)
+        cached = self.fuzzy_matches.get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        ranking = self.match_recipes(ingredient_list)
+        if ingredient_list is None:
+            ingredient_list = [item.name for item in self.food_items.values()]
+        names = list(dict.fromkeys(ingredient_list))
+        yield ranking
+        
+        matched = set()
+        for name in names:
+            matched |= self.recipe_index.matching_ingredients(name)
+        unranked = False  # Ingredients found since the last ranking
+        last_yield = time.perf_counter()
+        for found in self.fuzzy_index.match_stream(names, self.match_pool(), cancelled=cancelled):
+            new = {ingredient for _, ingredient in found} - matched
+            if new:
+                matched |= new
+                unranked = True
+            if unranked and time.perf_counter() - last_yield >= interval:
+                ranking = self.recipe_index.rank(matched)
+                yield ranking
+                unranked = False
+                last_yield = time.perf_counter()
+        if cancelled is not None and cancelled.is_set():
+            return
+        if unranked:
+            ranking = self.recipe_index.rank(matched)
+            yield ranking
+        if len(self.fuzzy_matches) >= 32:
+            self.fuzzy_matches.clear()
+        self.fuzzy_matches[key] = ranking
+
+    def match_pool(self):
+        """Worker processes for fuzzy matching, started on first use"""
+        with self.fuzzy_pool_lock:
+            if self.fuzzy_pool is None:
+                # Spawned rather than forked: the GUI process has threads running
+                self.fuzzy_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+            return self.fuzzy_pool
+
+    # Custom sort to prioritize expiring soon (0-3 days), then expired, then good
+    def sort_priority(self, days_left, category=None):
+        if 0 <= days_left <= self.alert_days(category):
+            return 0  # Expiring soon
+        elif days_left < 0:
+            return 1  # Expired
+        else:
+            return 2  # Good
+
+    def sorted_item_ids(self, today):
+        """Return item ids in sort_priority order: expiring soon, then expired, then good
+        
+        The expiry index is already ordered by date, so this just stitches
+        together slices of it instead of sorting the whole inventory. Only
+        the first max_alert_days days need the per-category threshold check.
+        """
+        expiring_soon = self.expiring_soon_ids(today)
+        expired = self.expiry_index.between(None, today - timedelta(days=1))
+        soon = set(expiring_soon)
+        horizon = today + timedelta(days=self.max_alert_days())
+        good = [item_id for item_id in self.expiry_index.between(today, horizon) if item_id not in soon]
+        good += self.expiry_index.between(horizon + timedelta(days=1), None)
+        return expiring_soon + expired + good
+
+    def synced_analytics(self):
+        """Return the analytics engine with the current inventory and history, or None without NumPy"""
+        if self.analytics is None:
+            return None
+        self.analytics.sync_inventory(self.food_items, self.inventory_version)
+        self.analytics.sync_history()
+        return self.analytics
+
+    @timed("compute_report")
+    def compute_report(self, report_type="weekly", start_date=None, end_date=None):
+        """Compute the food waste report data for the specified period
+        
+        start_date and end_date (inclusive) override the weekly or monthly
+        period ending today.
+        """
+        today = datetime.now().date()
+        
+        if end_date is None:
+            end_date = today
+        if start_date is None:
+            if report_type == "weekly":
+                start_date = end_date - timedelta(days=7)
+            else:  # monthly
+                start_date = end_date - timedelta(days=30)
+        
+        analytics = self.synced_analytics()
+        if analytics is not None:
+            return analytics.report(start_date, end_date, today)
+        
+        # Items still in the inventory that were bought during this period
+        report_items = []
+        active_items = 0
+        expired_items = 0
+        
+        # Process current inventory items
+        start_ordinal = start_date.toordinal()
+        end_ordinal = end_date.toordinal()
+        today_ordinal = today.toordinal()
+        for item_id, item_data in self.food_items.items():
+            if start_ordinal <= item_data.purchase_ordinal <= end_ordinal:
+                active_items += 1
+                days_left = item_data.expiry_ordinal - today_ordinal
+                
+                status = "Active"
+                if days_left < 0:
+                    status = "Expired"
+                    expired_items += 1
+                
+                report_items.append({
+                    'name': item_data['name'],
+                    'category': item_data['category'],
+                    'status': status,
+                    'purchase_date': item_data['purchase_date'].strftime('%Y-%m-%d'),
+                    'expiry_date': item_data['expiry_date'].strftime('%Y-%m-%d')
+                })
+        
+        # Items removed during this period come from the history's daily totals
+        removed = self.history.totals(start_date, end_date)
+        consumed_items = removed['consumed']
+        expired_items += removed['discarded'] + removed['expired']
+        total_items = active_items + consumed_items + removed['discarded'] + removed['expired']
+        
+        # Calculate waste percentage
+        if total_items > 0:
+            waste_percentage = (expired_items / total_items) * 100
+        else:
+            waste_percentage = 0
+        
+        report_data = {
+            'start_date': start_date.strftime('%Y-%m-%d'),
+            'end_date': end_date.strftime('%Y-%m-%d'),
+            'total_items': total_items,                   # Total items in period
+            'expired_items': expired_items,               # Items that expired
+            'consumed_items': consumed_items,             # Items that were consumed
+            'waste_percentage': waste_percentage,         # Percentage of waste
+            'items': report_items                         # List of items in the report
+        }
+        
+        return report_data
+
+    def close(self):
+        """Finish pending saves, release the storage backends and save the history totals"""
+        if self.fuzzy_pool is not None:
+            self.fuzzy_pool.shutdown(cancel_futures=True)
+        self.persistence.close()
+        self.storage.close()
+        self.history.close()
+        self.catalog.close()
+        if self.recipe_store is not None:
+            self.recipe_store.close()
+        if self.analytics is not None:
+            self.analytics.save()
+        capture.stop(self.app_dir)
+
+
+if __name__ == "__main__":
+    # Headless expiry sweep, e.g. for a nightly job
+    core = InventoryCore()
+    for name, days_left in core.get_expired():
+        print(f"EXPIRED: {name} ({-days_left} day(s) ago)")
+    for name, days_left in core.get_expiring_soon():
+        print(f"Expiring: {name} in {days_left} day(s)")
+    core.close()
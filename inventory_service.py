@@ -0,0 +1,312 @@
+"""Local HTTP/JSON service exposing the inventory engine to other programs
+
+Point-of-sale terminals and scripts can add and remove items, check what is
+expiring, ask for recipe suggestions and fetch reports without the window:
+
+    python inventory_service.py --port 8080
+
+    POST   /items                {"name", "category", "quantity", "purchase_date"?, "expiry_date"?}
+    DELETE /items/<id>?reason=consumed|discarded|expired
+    POST   /consume              {"name", "category", "quantity", "reason"?}   (earliest expiring lots first)
+    GET    /expiring?days=3                           (no days: per-category thresholds)
+    GET    /expired
+    GET    /recipes?ingredient=Milk&ingredient=Eggs   (no ingredients: the whole inventory)
+    GET    /recipes?fuzzy=1&ingredient=Tomatoe        (also match plurals and typos)
+    GET    /plan?days=3&meals=1                       (meals using up what expires soonest)
+    GET    /report?type=weekly|monthly&start=YYYY-MM-DD&end=YYYY-MM-DD   (start/end optional)
+    GET    /analytics/spoilage?start=&end=            (waste per category, needs NumPy)
+    GET    /analytics/expiry?category=                (days-to-expiry histogram, needs NumPy)
+    GET    /analytics/rollup?period=day|week|month&start=&end=&category=   (needs NumPy)
+    GET    /metrics                                   (call counts, latencies, bytes written)
+
+Everything runs on one asyncio event loop, so the in-memory inventory has a
+single writer. Writes are queued and applied in groups, each group as one
+InventoryCore batch, which leaves a single save to the persistence thread
+however many terminals are busy. A write response means the change is in
+the inventory and queued for saving.
+"""
+import argparse
+import asyncio
+import json
+import signal
+from collections import deque
+from datetime import date, timedelta
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from food_history import REMOVAL_REASONS
+from instrumentation import metrics
+from inventory_core import InventoryCore
+
+
+class RequestError(Exception):
+    """A request the service refuses, answered with the given HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class InventoryService:
+    """Serves one InventoryCore over HTTP/1.1 with keep-alive connections"""
+
+    def __init__(self, core, max_batch=500, max_body=1024 * 1024):
+        self.core = core
+        self.max_batch = max_batch  # Most writes applied in one batch
+        self.max_body = max_body
+        self.writes = None  # Queue of (operation, future), created on the loop
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        """Serve until cancelled or sent SIGTERM"""
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass  # Windows event loops have no signal handlers
+        self.writes = asyncio.Queue()
+        writer_task = asyncio.create_task(self.write_loop())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        port = server.sockets[0].getsockname()[1]
+        print(f"Serving on http://{host}:{port}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer_task.cancel()
+
+    async def write_loop(self):
+        """Apply queued writes in groups, one batch and one save per group"""
+        while True:
+            group = [await self.writes.get()]
+            # Let every connection with a request ready queue its write first
+            await asyncio.sleep(0)
+            while not self.writes.empty() and len(group) < self.max_batch:
+                group.append(self.writes.get_nowait())
+
+            with self.core.batch():
+                for operation, future in group:
+                    try:
+                        result = operation()
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                        continue
+                    if not future.done():
+                        future.set_result(result)
+
+    async def write(self, operation):
+        """Queue operation for the writer and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self.writes.put((operation, future))
+        return await future
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > self.max_body:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    status, payload = await self.dispatch(method, target, body)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                data = json.dumps(payload).encode('utf-8')
+                head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                        f"Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n")
+                if not keep_alive:
+                    head += "Connection: close\r\n"
+                writer.write(head.encode('latin-1') + b'\r\n' + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Client went away or sent something that is not HTTP
+        except asyncio.CancelledError:
+            pass  # The service is shutting down
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        """Route one request, returning (HTTPStatus, JSON payload)"""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            if parts == ["items"] and method == "POST":
+                item = self.parse_item(body)
+                item_id = await self.write(lambda: self.core.add_food_item(**item))
+                return HTTPStatus.CREATED, {"id": item_id}
+
+            if len(parts) == 2 and parts[0] == "items" and method == "DELETE":
+                reason = query.get('reason', ["consumed"])[0]
+                if reason not in REMOVAL_REASONS:
+                    raise RequestError(HTTPStatus.BAD_REQUEST, f"Unknown removal reason: {reason}")
+                if not await self.write(lambda: self.core.remove_food_item(parts[1], reason)):
+                    raise RequestError(HTTPStatus.NOT_FOUND, f"No item with id {parts[1]}")
+                return HTTPStatus.OK, {"removed": parts[1]}
+
+            if parts == ["consume"] and method == "POST":
+                name, category, quantity, reason = self.parse_consume(body)
+                taken = await self.write(lambda: self.core.consume_product(name, category, quantity, reason))
+                return HTTPStatus.OK, {"taken": taken}
+
+            if method != "GET":
+                raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not supported here")
+            if parts == ["expiring"]:
+                # Without days, each category's alert threshold applies
+                days = self.parse_int(query, 'days', None, 0, 365)
+                return HTTPStatus.OK, {"items": [{"name": name, "days_left": days_left}
+                                                 for name, days_left in self.core.get_expiring_soon(days)]}
+            if parts == ["expired"]:
+                return HTTPStatus.OK, {"items": [{"name": name, "days_left": days_left}
+                                                 for name, days_left in self.core.get_expired()]}
+            if parts == ["recipes"]:
+                if query.get('fuzzy', ["0"])[0] == "1":
+                    return HTTPStatus.OK, {"recipes": await self.fuzzy_recipes(query.get('ingredient'))}
+                return HTTPStatus.OK, {"recipes": self.core.match_recipes(query.get('ingredient'))}
+            if parts == ["plan"]:
+                days = self.parse_int(query, 'days', 3, 1, 31)
+                meals = self.parse_int(query, 'meals', 1, 1, 10)
+                return HTTPStatus.OK, {"meals": [dict(meal, recipe=meal['recipe']['name'])
+                                                 for meal in self.core.plan_meals(days, meals)]}
+            if parts == ["metrics"]:
+                return HTTPStatus.OK, metrics.snapshot()
+            if parts == ["report"]:
+                report_type = query.get('type', ["weekly"])[0]
+                if report_type not in ("weekly", "monthly"):
+                    raise RequestError(HTTPStatus.BAD_REQUEST, f"Unknown report type: {report_type}")
+                start_date, end_date = self.parse_range(query)
+                return HTTPStatus.OK, self.core.compute_report(report_type, start_date, end_date)
+            if len(parts) == 2 and parts[0] == "analytics":
+                return HTTPStatus.OK, self.analytics(parts[1], query)
+            raise RequestError(HTTPStatus.NOT_FOUND, f"No such endpoint: {url.path}")
+        except RequestError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            print(f"Error handling {method} {target}: {e}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+    async def fuzzy_recipes(self, ingredient_list):
+        """Return the complete fuzzy recipe ranking without holding up other requests
+
+        Only the first, exact ranking reads the inventory, so it is taken on
+        the loop; the fuzzy scoring after it runs on a worker thread. The
+        core caches complete rankings per inventory version.
+        """
+        stream = self.core.fuzzy_recipe_matches(ingredient_list)
+        recipes = next(stream)
+        rest = await asyncio.get_running_loop().run_in_executor(None, deque, stream, 1)
+        return rest[-1] if rest else recipes
+
+    def parse_consume(self, body):
+        """Turn a POST /consume body into consume_product arguments, rejecting bad input"""
+        try:
+            record = json.loads(body)
+            name, category = record['name'], record['category']
+            quantity = float(record['quantity'])
+        except (ValueError, TypeError, KeyError) as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid consume request: {e}")
+        reason = record.get('reason', "consumed")
+        if reason not in REMOVAL_REASONS:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Unknown removal reason: {reason}")
+        return name, category, quantity, reason
+
+    def parse_int(self, query, key, default, low, high):
+        """Return a whole number query parameter between low and high, default when not given"""
+        if key not in query:
+            return default
+        try:
+            value = int(query[key][0])
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"{key} must be a whole number")
+        if not low <= value <= high:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"{key} must be {low}-{high}")
+        return value
+
+    def parse_range(self, query):
+        """Return the (start, end) dates of a query, None where not given"""
+        try:
+            return tuple(date.fromisoformat(query[key][0]) if key in query else None for key in ("start", "end"))
+        except ValueError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid date: {e}")
+
+    def analytics(self, name, query):
+        """Answer one of the /analytics endpoints"""
+        analytics = self.core.synced_analytics()
+        if analytics is None:
+            raise RequestError(HTTPStatus.NOT_IMPLEMENTED, "Analytics need NumPy, which is not installed")
+        today = date.today()
+        start_date, end_date = self.parse_range(query)
+        end_date = end_date or today
+        start_date = start_date or end_date - timedelta(days=30)
+        category = query.get('category', [None])[0]
+        if name == "spoilage":
+            return {"start_date": start_date.isoformat(), "end_date": end_date.isoformat(),
+                    "waste_percentage": analytics.waste_rate(start_date, end_date),
+                    "categories": analytics.spoilage_by_category(start_date, end_date)}
+        if name == "expiry":
+            return {"bins": analytics.expiry_histogram(today, category=category)}
+        if name == "rollup":
+            period = query.get('period', ["day"])[0]
+            if period not in ("day", "week", "month"):
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Unknown rollup period: {period}")
+            return {"period": period, "rows": analytics.rollup(start_date, end_date, period, category)}
+        raise RequestError(HTTPStatus.NOT_FOUND, f"No such analytics: {name}")
+
+    def parse_item(self, body):
+        """Turn a POST /items body into add_food_item arguments, rejecting bad input"""
+        try:
+            record = json.loads(body)
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+        if not isinstance(record, dict) or not isinstance(record.get('name'), str) or not record['name'].strip():
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Item name is required")
+
+        try:
+            item = {
+                "name": record['name'].strip(),
+                "category": str(record.get('category') or ""),
+                "quantity": float(record.get('quantity', 1))
+            }
+            for key in ("purchase_date", "expiry_date"):
+                if record.get(key):
+                    item[key] = date.fromisoformat(record[key])
+        except (TypeError, ValueError) as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid item: {e}")
+        return item
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    parser.add_argument("--storage", default="json", choices=["json", "journal", "sqlite"])
+    parser.add_argument("--app-dir", help="data directory, ~/FoodWasteLogger by default")
+    args = parser.parse_args()
+
+    core = InventoryCore(args.storage, args.app_dir)
+    try:
+        asyncio.run(InventoryService(core).serve(args.host, args.port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        core.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Meal plans that use up the food about to expire
+
+Planning is treated as weighted set cover. Each soon-to-expire product is an
+element weighted by its quantity, more heavily the sooner it expires, and
+each recipe covers the products matching its ingredients. Every meal slot,
+day by day, takes the recipe covering the most weight not covered yet, and
+a product can only be covered on a day it is still good.
+
+Covering products or moving to a later day can only lower a recipe's gain,
+so the greedy choice is made lazily: the gains in the heap are upper bounds
+and only the recipe on top is rescored, which keeps large recipe libraries
+cheap to plan against.
+"""
+import heapq
+
+
+def product_weight(quantity, days_left):
+    """Weight of a product in the plan: its quantity, scaled up the sooner it expires"""
+    return (quantity or 0) / (1 + max(days_left, 0))
+
+
+def plan_meals(products, recipe_index, days=3, meals_per_day=1):
+    """Pick recipes for days * meals_per_day meals that cover the most expiring food
+
+    products is a list of (name, category, quantity, days left) and
+    recipe_index a RecipeIndex over the recipe library. Returns one dict
+    per planned meal, in order: day (0 is today), recipe, uses (the names
+    of the products it uses up) and quantity (their total quantity). The
+    plan stops early once no recipe uses anything still uncovered.
+    """
+    # Products of the same name match the same recipes, so they are covered
+    # together: a recipe on day d uses every one of them still good that day,
+    # and the rest have expired for the rest of the plan anyway
+    names = {}  # name -> indexes of its products
+    for index, (name, _, _, _) in enumerate(products):
+        names.setdefault(name, []).append(index)
+    names = list(names.items())
+
+    # gains[group][day]: weight the group still has to offer on that day
+    gains = []
+    for _, indexes in names:
+        by_day = [0.0] * days
+        for index in indexes:
+            _, _, quantity, days_left = products[index]
+            for day in range(min(days_left, days - 1) + 1):
+                by_day[day] += product_weight(quantity, days_left)
+        gains.append(by_day)
+
+    # Recipe position -> groups of products it can use
+    covers = {}
+    for group, (name, _) in enumerate(names):
+        for ingredient in recipe_index.matching_ingredients(name):
+            for position in recipe_index.ingredient_recipes[ingredient]:
+                covers.setdefault(position, set()).add(group)
+
+    covered = [False] * len(names)
+
+    def gain(position, day):
+        return sum(gains[group][day] for group in covers[position] if not covered[group])
+
+    heap = [(-gain(position, 0), position) for position in covers] if days > 0 else []
+    heapq.heapify(heap)
+
+    plan = []
+    for day in range(days):
+        for _ in range(meals_per_day):
+            chosen = None
+            while heap:
+                _, position = heapq.heappop(heap)
+                current = gain(position, day)
+                if current <= 0:
+                    continue  # Gains never grow back, so this recipe is done
+                if not heap or -heap[0][0] <= current:
+                    chosen = position
+                    break
+                heapq.heappush(heap, (-current, position))
+            if chosen is None:
+                return plan
+
+            uses = []
+            for group in sorted(covers[chosen]):
+                if not covered[group] and gains[group][day] > 0:
+                    covered[group] = True
+                    uses.extend(index for index in names[group][1] if products[index][3] >= day)
+            plan.append({
+                'day': day,
+                'recipe': recipe_index.recipes[chosen],
+                'uses': list(dict.fromkeys(products[index][0] for index in uses)),
+                'quantity': sum(products[index][2] or 0 for index in uses)
+            })
+    return plan
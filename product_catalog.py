@@ -0,0 +1,92 @@
+"""Offline product catalog behind barcode scanning
+
+Products (barcode, name, category and typical shelf life) are kept in an
+SQLite database keyed by barcode, so a lookup is a single index probe
+however large the catalog grows. Checkout scans repeat the same few
+products, so recently scanned codes, unknown ones included, are answered
+from a small LRU in front of the database.
+
+    python product_catalog.py products.csv
+
+imports a CSV with barcode, name, category and shelf_life_days columns
+into ~/FoodWasteLogger/products.db.
+"""
+import csv
+import sqlite3
+import sys
+from collections import OrderedDict
+from pathlib import Path
+
+
+class Product:
+    """One catalog entry; shelf_life_days None means the category default"""
+
+    __slots__ = ("barcode", "name", "category", "shelf_life_days")
+
+    def __init__(self, barcode, name, category, shelf_life_days=None):
+        self.barcode = barcode
+        self.name = sys.intern(name)
+        self.category = sys.intern(category)
+        self.shelf_life_days = shelf_life_days
+
+
+class ProductCatalog:
+    """Barcode lookups against an SQLite product table with an LRU of recent scans"""
+
+    def __init__(self, path, cache_size=512):
+        self.path = Path(path)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # barcode -> Product or None, least recently scanned first
+        # Opened with the core but used from whichever thread scans
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS products (barcode TEXT PRIMARY KEY, name TEXT NOT NULL, "
+                          "category TEXT NOT NULL, shelf_life_days INTEGER) WITHOUT ROWID")
+        self.conn.commit()
+
+    def lookup(self, barcode):
+        """Return the Product for barcode, or None if the catalog does not know it"""
+        barcode = barcode.strip()
+        if barcode in self.cache:
+            self.cache.move_to_end(barcode)
+            return self.cache[barcode]
+
+        row = self.conn.execute("SELECT name, category, shelf_life_days FROM products WHERE barcode = ?",
+                                (barcode,)).fetchone()
+        product = Product(barcode, *row) if row else None
+        self.cache[barcode] = product
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return product
+
+    def add_product(self, barcode, name, category, shelf_life_days=None):
+        """Add or replace a product, e.g. one the user described after an unknown scan"""
+        product = Product(barcode.strip(), name, category, shelf_life_days)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?)",
+                              (product.barcode, product.name, product.category, shelf_life_days))
+        if product.barcode in self.cache:
+            self.cache[product.barcode] = product
+        return product
+
+    def import_csv(self, path):
+        """Add every product of a CSV file in one transaction and return how many there were"""
+        with open(path, newline='', encoding='utf-8-sig') as file:
+            rows = [(row['barcode'].strip(), row['name'], row['category'],
+                     int(row['shelf_life_days']) if row.get('shelf_life_days') else None)
+                    for row in csv.DictReader(file)]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?)", rows)
+        self.cache.clear()
+        return len(rows)
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    app_dir = Path.home() / "FoodWasteLogger"
+    app_dir.mkdir(exist_ok=True)
+    catalog = ProductCatalog(app_dir / "products.db")
+    for csv_path in sys.argv[1:]:
+        print(f"Imported {catalog.import_csv(csv_path)} products from {csv_path}")
+    catalog.close()
@@ -1,171 +1,209 @@
-﻿class FoodWasteLogger:
+﻿import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from PyQt5.QtCore import QDate, QFileSystemWatcher, Qt, QTimer
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import (QApplication, QCheckBox, QComboBox, QDateEdit,
+                             QDialog, QFileDialog, QGridLayout, QHBoxLayout,
+                             QInputDialog, QLabel, QLineEdit, QMainWindow,
+                             QMessageBox, QProgressDialog, QPushButton,
+                             QShortcut, QTableView, QVBoxLayout, QWidget)
+
+from food_transfer import FORMATS
+from instrumentation import timed
+from inventory_core import InventoryCore
+from PythonApplication6 import (ExpiryDialog, FirstPaintWatcher, FoodTableModel,
+                                LoggerSignals, LotsDialog, MealPlanDialog,
+                                MetricsDialog, ProductTableModel, RecipeDialog,
+                                RecipeSelectionDialog, ReportDialog, ScanDialog,
+                                StartupExpiryDialog)
+
+TRANSFER_FILTER = "JSON Lines (*.jsonl);;CSV (*.csv)"
+
+
+class FoodWasteLogger(InventoryCore):
     """Simple Food Waste Logger to track groceries and prevent food waste"""
     
-    def __init__(self):
-        self.food_items = {}  # Dictionary to store all food items
-        self.food_categories = {
-            "Dairy": 7,      # Default shelf life in days
-            "Meat": 4,
-            "Vegetables": 7,
-            "Fruits": 7,
-            "Bakery": 5,
-            "Pantry": 180
-        }
-        
-        self.recipes = [
-            {
-                "name": "Vegetable Stir Fry",
-                "ingredients": ["Carrot", "Broccoli", "Rice"],
-                "instructions": "1. Chop vegetables into bite-sized pieces.\n2. Cook rice according to package instructions.\n3. Heat oil in a pan and stir fry vegetables for 5-7 minutes.\n4. Season with salt and pepper.\n5. Serve vegetables over rice."
-            },
-            {
-                "name": "Chicken Salad",
-                "ingredients": ["Chicken", "Tomato", "Spinach"],
-                "instructions": "1. Cook chicken until no longer pink inside.\n2. Chop tomatoes and prepare spinach leaves.\n3. Combine all ingredients in a bowl.\n4. Add your favorite dressing and toss to coat."
-            },
-            {
-                "name": "Fruit Smoothie",
-                "ingredients": ["Banana", "Yogurt", "Milk"],
-                "instructions": "1. Cut banana into chunks.\n2. Add banana, yogurt and milk to a blender.\n3. Blend until smooth.\n4. Pour into a glass and enjoy immediately."
-            },
-            {
-                "name": "Simple Pasta",
-                "ingredients": ["Pasta", "Tomato", "Cheese"],
-                "instructions": "1. Cook pasta according to package instructions.\n2. While pasta cooks, dice tomatoes.\n3. Drain pasta and return to pot.\n4. Add tomatoes and grated cheese, stir until cheese melts."
-            },
-            {
-                "name": "Quick Omelet",
-                "ingredients": ["Eggs", "Cheese", "Spinach"],
-                "instructions": "1. Beat eggs in a bowl.\n2. Heat butter in a pan over medium heat.\n3. Pour in eggs and cook until almost set.\n4. Add cheese and spinach to one half, fold over the other half.\n5. Cook until cheese melts."
-            }
-        ]
-        
-        self.setup_data_storage()
-        self.load_data()
+    def __init__(self, storage_mode="json", app_dir=None):
+        self.start_time = time.perf_counter()
+        self.startup_timings = {}  # Milliseconds from start to "first_paint" and "loaded"
+        self.running = False
+        self.loaded = False
+        # Created first: saves can start failing while the core is loading
+        self.signals = LoggerSignals()
+        self.signals.save_failed.connect(self.show_save_error)
+        self.signals.inventory_loaded.connect(self.inventory_ready)
+        self.signals.recipe_matches.connect(self.show_recipe_matches)
+        self.recipe_dialog = None  # Recipe selection dialog receiving fuzzy matches
+        super().__init__(storage_mode, app_dir, load=False)
         self.setup_gui()
-    
-    def setup_data_storage(self):
-        """Setup appropriate directories for data storage"""
-        home_dir = Path.home()
-        
-        self.app_dir = home_dir / "FoodWasteLogger"
-        try:
-            self.app_dir.mkdir(exist_ok=True)
-        except Exception as e:
-            print(f"Could not create directory in home folder: {e}")
-            self.app_dir = Path.cwd()
         
-        self.data_file = self.app_dir / "food_inventory.json"
-        print(f"Data will be stored at: {self.data_file}")
-        
-    def load_data(self):
-        """Load existing food inventory data from file with improved error handling"""
-        try:
-            if self.data_file.exists():
-                with open(self.data_file, 'r') as file:
-                    data = json.load(file)
-                    for item_id, item_data in data.items():
-                        if 'purchase_date' in item_data:
-                            try:
-                                item_data['purchase_date'] = datetime.strptime(
-                                    item_data['purchase_date'], '%Y-%m-%d').date()
-                            except ValueError:
-                                item_data['purchase_date'] = datetime.now().date()
-                                
-                        if 'expiry_date' in item_data:
-                            try:
-                                item_data['expiry_date'] = datetime.strptime(
-                                    item_data['expiry_date'], '%Y-%m-%d').date()
-                            except ValueError:
-                                item_data['expiry_date'] = datetime.now().date() + timedelta(days=7)
-                    
-                    self.food_items = data
-        except Exception as e:
-            print(f"Error loading data: {e}")
-            QMessageBox.warning(None, "Data Loading Error", 
-                              f"Could not load existing data: {e}\nStarting with an empty inventory.")
-            self.food_items = {}
-            
-    def save_data(self):
-        """Save current food inventory to file with improved error handling"""
-        try:
-            data_to_save = {}
-            for item_id, item_data in self.food_items.items():
-                data_to_save[item_id] = item_data.copy()
-                if 'purchase_date' in data_to_save[item_id]:
-                    data_to_save[item_id]['purchase_date'] = data_to_save[item_id]['purchase_date'].strftime('%Y-%m-%d')
-                if 'expiry_date' in data_to_save[item_id]:
-                    data_to_save[item_id]['expiry_date'] = data_to_save[item_id]['expiry_date'].strftime('%Y-%m-%d')
-            
-            if self.data_file.exists():
-                backup_file = self.app_dir / "food_inventory_backup.json"
-                try:
-                    with open(self.data_file, 'r') as src, open(backup_file, 'w') as dst:
-                        dst.write(src.read())
-                except Exception as e:
-                    print(f"Warning: Could not create backup: {e}")
-            
-            with open(self.data_file, 'w') as file:
-                json.dump(data_to_save, file, indent=2)
-                
-        except Exception as e:
-            error_msg = f"Could not save data: {e}"
-            print(error_msg)
-            QMessageBox.critical(self.window, "Save Error", error_msg)
-
-    def add_food_item(self, name, category, quantity, purchase_date=None, expiry_date=None):
-        """Add a new food item to the inventory"""
-        if not purchase_date:
-            purchase_date = datetime.now().date()
-            
-        if not expiry_date:
-            shelf_life = self.food_categories.get(category, 7)
-            expiry_date = purchase_date + timedelta(days=shelf_life)
-        
-        item_id = f"{name.lower().replace(' ', '')}{int(datetime.now().timestamp())}"
-        
-        self.food_items[item_id] = {
-            "name": name,
-            "category": category,
-            "quantity": quantity,
-            "purchase_date": purchase_date,
-            "expiry_date": expiry_date
-        }
-        
-        self.save_data()
+        # Show the window straight away and read the inventory in the background
+        self.loader = threading.Thread(target=self.load_in_background, name="inventory-loader", daemon=True)
+        self.loader.start()
+
+    def load_in_background(self):
+        """Read the recipes and inventory off the GUI thread and hand them to inventory_ready"""
+        self.load_recipes()
+        self.signals.inventory_loaded.emit(self.read_inventory())
+
+    def startup_mark(self, name):
+        """Record how long after start a startup milestone was reached"""
+        self.startup_timings[name] = (time.perf_counter() - self.start_time) * 1000
+
+    def inventory_ready(self, loaded):
+        """Show the inventory once the loader thread has read it"""
+        self.install_inventory(loaded)
+        self.loaded = True
         self.update_food_list()
-        return item_id
-        
-    def remove_food_item(self, item_id):
-        """Remove a food item from the inventory"""
-        if item_id in self.food_items:
-            del self.food_items[item_id]
-            self.save_data()
-            self.update_food_list()
-            return True
-        return False
-
-    def show_recipe_selection_dialog(self, matching_recipes):
-        """Show the recipe selection dialog"""
-        selection_dialog = RecipeSelectionDialog(self.window, matching_recipes)
-        result = selection_dialog.exec_()
+        self.window.centralWidget().setEnabled(True)
+        self.window.statusBar().clearMessage()
+        self.watch_storage()
+        self.start_expiry_scheduler()
+        self.startup_mark("loaded")
+        print(f"Startup: first paint after {self.startup_timings.get('first_paint', 0):.0f} ms, "
+              f"{len(self.food_items)} items loaded after {self.startup_timings['loaded']:.0f} ms")
+        
+        if self.load_error:
+            QMessageBox.warning(self.window, "Data Loading Error", 
+                              f"Could not load existing data: {self.load_error}\nStarting with an empty inventory.")
+        if self.running:
+            self.show_startup_notification()
+
+    def close(self):
+        """Let the inventory loader finish before the storage is released"""
+        self.loader.join()
+        super().close()
+
+    def watch_storage(self):
+        """Pick up changes other loggers make to the shared storage as they happen"""
+        if not self.storage.watch_paths():
+            return
+        self.storage_watcher = QFileSystemWatcher(self.window)
+        self.storage_watcher.fileChanged.connect(self.storage_changed)
+        self.storage_watcher.directoryChanged.connect(self.storage_changed)
+        self.rewatch_storage()
+        
+        # Coalesce the burst of notifications a single save produces
+        self.reload_timer = QTimer(self.window)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(200)
+        self.reload_timer.timeout.connect(self.sync_storage)
+        
+        # Network shares often deliver no change notifications at all
+        self.poll_timer = QTimer(self.window)
+        self.poll_timer.timeout.connect(self.sync_storage)
+        self.poll_timer.start(10000)
+
+    def rewatch_storage(self):
+        """Watch the storage files again; a file replaced by a save drops out of the watcher
+        
+        The data directory is only watched while a storage file does not
+        exist yet, so our own temp, cache and history writes next to the
+        storage do not trigger syncs.
+        """
+        paths = self.storage.watch_paths()
+        existing = [str(path) for path in paths if path.exists()]
+        missing = [path for path in existing if path not in self.storage_watcher.files()]
+        if missing:
+            self.storage_watcher.addPaths(missing)
+        
+        app_dir = str(self.app_dir)
+        watching_dir = app_dir in self.storage_watcher.directories()
+        if len(existing) < len(paths) and not watching_dir:
+            self.storage_watcher.addPath(app_dir)
+        elif len(existing) == len(paths) and watching_dir:
+            self.storage_watcher.removePath(app_dir)
+
+    def storage_changed(self, path):
+        self.reload_timer.start()
+
+    def sync_storage(self):
+        """Merge other loggers' changes into the table"""
+        self.rewatch_storage()
+        changed = self.reload_changes()
+        if changed:
+            self.window.statusBar().showMessage(f"{len(changed)} items updated by another logger", 5000)
+
+    def start_expiry_scheduler(self):
+        """Keep Days Left and the expiry colors current while the app stays open"""
+        self.expiry_timer = QTimer(self.window)
+        self.expiry_timer.setSingleShot(True)
+        self.expiry_timer.timeout.connect(self.expiry_sweep)
+        self.schedule_expiry_sweep()
+
+    def schedule_expiry_sweep(self):
+        """Sleep until the next midnight, the only time an item's expiry status can change"""
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        # Capped so a suspended machine or a clock change is noticed within the hour
+        self.expiry_timer.start(min(int((midnight - now).total_seconds() * 1000) + 1000, 3600 * 1000))
+
+    def expiry_sweep(self):
+        """Move the table to the new day and alert about items that started expiring soon"""
+        today = datetime.now().date()
+        if today != self.food_model.today:
+            expiring = self.food_model.advance_day(today)
+            self.product_model.advance_day(today)
+            if expiring:
+                items = self.product_days_left(expiring, today)
+                # Not modal: nobody may be at the screen when the day changes
+                self.expiry_alert = ExpiryDialog(self.window, self, items)
+                self.expiry_alert.show()
+        self.schedule_expiry_sweep()
+
+    def save_failed(self, error_msg):
+        """Forward save errors from the persistence thread to the GUI thread"""
+        self.signals.save_failed.emit(error_msg)
+
+    def show_save_error(self, error_msg):
+        """Show save errors to the user"""
+        QMessageBox.critical(self.window, "Save Error", error_msg)
+
+    def show_recipe_selection_dialog(self, matching_recipes, cancelled):
+        """Show the recipe selection dialog, improving its ranking with fuzzy matches as they arrive
+        
+        matching_recipes is a fuzzy_recipe_matches stream and cancelled the
+        threading.Event that stops it, set once the dialog closes.
+        """
+        selection_dialog = RecipeSelectionDialog(self.window, next(matching_recipes))
+        selection_dialog.set_searching(True)
+        self.recipe_dialog = selection_dialog
+        threading.Thread(target=self.stream_recipe_matches, args=(selection_dialog, matching_recipes),
+                         name="recipe-matcher", daemon=True).start()
+        try:
+            result = selection_dialog.exec_()
+        finally:
+            self.recipe_dialog = None
+            cancelled.set()
     
         if result == QDialog.Accepted and selection_dialog.selected_recipe:
-            recipe_dialog = RecipeDialog(self.window, selection_dialog.selected_recipe)
+            recipe = self.recipe_store.full_recipe(selection_dialog.selected_recipe)
+            recipe_dialog = RecipeDialog(self.window, recipe)
             recipe_dialog.exec_()
-        
-    def get_expiring_soon(self, days=3):
-        """Get a list of items expiring within the specified number of days"""
-        today = datetime.now().date()
-        expiring_soon = []
-        
-        for item_id, item_data in self.food_items.items():
-            days_left = (item_data['expiry_date'] - today).days
-            if 0 <= days_left <= days:
-                expiring_soon.append((item_data['name'], days_left))
-                
-        return expiring_soon
-        
+
+    def stream_recipe_matches(self, dialog, matching_recipes):
+        """Pass the rest of a fuzzy ranking stream to the GUI thread"""
+        try:
+            for ranking in matching_recipes:
+                self.signals.recipe_matches.emit(dialog, ranking)
+        except Exception as e:
+            # E.g. a broken process pool; the dialog keeps the best ranking so far
+            print(f"Error matching recipes: {e}")
+        finally:
+            self.signals.recipe_matches.emit(dialog, None)
+
+    def show_recipe_matches(self, dialog, matching_recipes):
+        """Show an improved ranking in the dialog it was computed for, if it is still open"""
+        if dialog is not self.recipe_dialog:
+            return
+        if matching_recipes is None:
+            dialog.set_searching(False)
+        else:
+            dialog.set_matches(matching_recipes)
+
     def check_notifications(self):
         """Check for items that are about to expire and display notifications"""
         expiring_items = self.get_expiring_soon()
@@ -179,44 +217,16 @@
     def suggest_recipes(self, ingredient_list=None):
         """Suggest recipes based on available ingredients"""
         if ingredient_list is None:
-            ingredient_list = [item['name'] for item in self.food_items.values()]
-        
-        print(f"Looking for recipes with ingredients: {ingredient_list}")
-        
-        matching_recipes = []
-        
-        for recipe in self.recipes:
-            match_count = 0
-            matched_ingredients = []
-            
-            for recipe_ing in recipe['ingredients']:
-                for item in ingredient_list:
-                    if (recipe_ing.lower() in item.lower() or 
-                        item.lower() in recipe_ing.lower()):
-                        match_count += 1
-                        matched_ingredients.append(recipe_ing)
-                        break
-            
-            if recipe['ingredients']:
-                match_percentage = (match_count / len(recipe['ingredients'])) * 100
-            else:
-                match_percentage = 0
-                
-            if match_count > 0:
-                matching_recipes.append({
-                    'recipe': recipe,
-                    'match_count': match_count,
-                    'match_percentage': match_percentage,
-                    'matched_ingredients': matched_ingredients
-                })
-        
-        matching_recipes.sort(key=lambda x: x['match_count'], reverse=True)
-        
-        if matching_recipes:
-            self.show_recipe_selection_dialog(matching_recipes)
+            print("Looking for recipes with the current inventory")
         else:
-            QMessageBox.information(self.window, "Recipe Suggestions", 
-                            "No recipes found for your current inventory.")
+            print(f"Looking for recipes with ingredients: {ingredient_list}")
+        
+        cancelled = threading.Event()
+        self.show_recipe_selection_dialog(self.fuzzy_recipe_matches(ingredient_list, cancelled), cancelled)
+
+    def show_meal_plan(self):
+        """Show meals for the next days that use up the food expiring soonest"""
+        MealPlanDialog(self.window, self).exec_()
 
     def update_expiry_date(self):
         """Update the expiry date based on the selected category"""
@@ -226,56 +236,49 @@
         expiry_date = purchase_date + timedelta(days=shelf_life)
         self.expiry_date_picker.setDate(QDate(expiry_date.year, expiry_date.month, expiry_date.day))
 
-    # Custom sort to prioritize expiring soon (0-3 days), then expired, then good
-    def sort_priority(self, days_left):
-        if 0 <= days_left <= 3:
-            return 0  # Expiring soon
-        elif days_left < 0:
-            return 1  # Expired
-        else:
-            return 2  # Good
-
+    @timed("update_food_list")
     def update_food_list(self):
         """Update the displayed list of food items in the UI"""
-        self.food_table.setRowCount(0)
-        
-        today = datetime.now().date()
-    
-        # Create a sorted list of items based on days_left (expired first)
-        sorted_items = []
-        for item_id, item_data in self.food_items.items():
-            days_left = (item_data['expiry_date'] - today).days
-            sorted_items.append((item_id, item_data, days_left))
-    
-        # Sort by days_left (expired items first)
-        sorted_items.sort(key=lambda x: (self.sort_priority(x[2]), x[2]))
+        self.food_model.reload()
+        self.product_model.reload()
 
-    
-        row = 0
-        for item_id, item_data, days_left in sorted_items:
-            self.food_table.insertRow(row)
-            self.food_table.setItem(row, 0, QTableWidgetItem(item_data['name']))
-            self.food_table.setItem(row, 1, QTableWidgetItem(item_data['category']))
-            self.food_table.setItem(row, 2, QTableWidgetItem(str(item_data['quantity'])))
-            self.food_table.setItem(row, 3, QTableWidgetItem(item_data['purchase_date'].strftime('%Y-%m-%d')))
-            self.food_table.setItem(row, 4, QTableWidgetItem(item_data['expiry_date'].strftime('%Y-%m-%d')))
-            self.food_table.setItem(row, 5, QTableWidgetItem(f"{days_left} days"))
-        
-            color = QColor(200, 255, 200)  # Light green for non-expiring items
-            if days_left < 0:
-                color = QColor(255, 200, 200)  # Light red for expired
-            elif days_left <= 3:
-                color = QColor(255, 255, 200)  # Light yellow for expiring soon
-                
-            for col in range(self.food_table.columnCount()):
-                self.food_table.item(row, col).setBackground(color)
-            
-            self.food_table.item(row, 0).setData(Qt.UserRole, item_id)
-            row += 1
+    def grouped(self):
+        """Whether the table shows products rather than individual lots"""
+        return self.food_table.model() is self.product_model
+
+    def group_by_product(self, grouped):
+        """Switch the table between one row per product and one row per lot"""
+        self.food_table.setModel(self.product_model if grouped else self.food_model)
+        self.filter_food_list(self.search_entry.text())
+
+    @timed("filter_food_list")
+    def filter_food_list(self, query):
+        """Show only the items matching the search box"""
+        self.food_model.set_filter(query)
+        self.product_model.set_filter(query)
+        model = self.food_table.model()
+        if model.query:
+            total = len(self.product_index) if self.grouped() else len(self.food_items)
+            self.window.statusBar().showMessage(f"Showing {len(model.item_ids)} of {total} "
+                                                f"{'products' if self.grouped() else 'items'}")
+        else:
+            self.window.statusBar().clearMessage()
+
+    @timed("refresh_items")
+    def refresh_items(self, item_ids):
+        """Update only the table rows of the given items"""
+        self.food_model.update_items(item_ids)
+        self.product_model.update_items(item_ids)
+
+    def show_lots(self, index):
+        """List the lots of a product double-clicked in the grouped table"""
+        if self.grouped():
+            LotsDialog(self.window, self, self.product_model.item_id_at(index.row())).exec_()
 
     def setup_gui(self):
         """Set up the graphical user interface"""
-        self.app = QApplication([])
+        self.app = QApplication.instance() or QApplication([])
+        self.first_paint = FirstPaintWatcher(self.app, lambda: self.startup_mark("first_paint"))
         self.window = QMainWindow()
         self.window.setWindowTitle("Food Waste Logger")
         self.window.resize(900, 600)
@@ -320,9 +323,27 @@
         
         main_layout.addWidget(top_frame)
         
-        self.food_table = QTableWidget()
-        self.food_table.setColumnCount(6)
-        self.food_table.setHorizontalHeaderLabels(["Name", "Category", "Quantity", "Purchase Date", "Expiry Date", "Days Left"])
+        search_frame = QWidget()
+        search_layout = QHBoxLayout(search_frame)
+        search_layout.setContentsMargins(0, 0, 0, 0)
+        self.search_entry = QLineEdit()
+        self.search_entry.setPlaceholderText("Search by name or category")
+        self.search_entry.setClearButtonEnabled(True)
+        self.search_entry.textChanged.connect(self.filter_food_list)
+        search_layout.addWidget(self.search_entry)
+        
+        group_check = QCheckBox("Group by product")
+        group_check.setToolTip("One row per product; double-click a row to see its lots")
+        group_check.toggled.connect(self.group_by_product)
+        search_layout.addWidget(group_check)
+        main_layout.addWidget(search_frame)
+        
+        self.food_model = FoodTableModel(self)
+        self.product_model = ProductTableModel(self)
+        self.food_table = QTableView()
+        self.food_table.setModel(self.food_model)
+        self.food_table.doubleClicked.connect(self.show_lots)
+        self.food_table.setSelectionBehavior(QTableView.SelectRows)
         self.food_table.setAlternatingRowColors(True)
         
         main_layout.addWidget(self.food_table)
@@ -346,6 +367,10 @@
         recipe_btn = QPushButton("Suggest Recipe")
         recipe_btn.clicked.connect(lambda: self.suggest_recipes())
         button_layout.addWidget(recipe_btn)
+        
+        plan_btn = QPushButton("Plan Meals")
+        plan_btn.clicked.connect(self.show_meal_plan)
+        button_layout.addWidget(plan_btn)
 
         weekly_report_btn = QPushButton("Weekly Report")
         weekly_report_btn.clicked.connect(lambda: self.generate_report("weekly"))
@@ -354,6 +379,14 @@
         monthly_report_btn = QPushButton("Monthly Report")
         monthly_report_btn.clicked.connect(lambda: self.generate_report("monthly"))
         button_layout.addWidget(monthly_report_btn)
+
+        import_btn = QPushButton("Import...")
+        import_btn.clicked.connect(self.import_inventory)
+        button_layout.addWidget(import_btn)
+
+        export_btn = QPushButton("Export...")
+        export_btn.clicked.connect(self.export_inventory)
+        button_layout.addWidget(export_btn)
         
         exit_btn = QPushButton("Exit")
         exit_btn.clicked.connect(self.window.close)
@@ -363,15 +396,25 @@
         
         self.window.setCentralWidget(main_widget)
         
+        diagnostics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self.window)
+        diagnostics_shortcut.activated.connect(self.show_diagnostics)
+        
+        # Enabled again by inventory_ready once the inventory is read
+        main_widget.setEnabled(False)
+        self.window.statusBar().showMessage("Loading inventory...")
         self.update_food_list()
         
         self.window.show()
-    
+
+    def show_diagnostics(self):
+        """Show call counts and latencies of the instrumented operations (Ctrl+Shift+D)"""
+        MetricsDialog(self.window).exec_()
+
     def scan_product(self):
         """Open the scan product dialog"""
         scan_dialog = ScanDialog(self.window, self)
         scan_dialog.exec_()
-    
+
     def add_item_from_form(self):
         """Add a food item from the form inputs"""
         name = self.name_entry.text().strip()
@@ -396,100 +439,121 @@
         self.quantity_entry.clear()
         
         QMessageBox.information(self.window, "Success", f"Added {name} to inventory.")
-    
+
     def remove_selected(self):
         """Remove the selected item from the inventory"""
-        selected_items = self.food_table.selectedItems()
-        if not selected_items:
+        selected_rows = self.food_table.selectionModel().selectedRows()
+        if not selected_rows:
             QMessageBox.information(self.window, "Selection Required", "Please select an item to remove.")
             return
             
-        selected_row = selected_items[0].row()
-        name_item = self.food_table.item(selected_row, 0)
-        item_id = name_item.data(Qt.UserRole)
-        item_name = self.food_items[item_id]['name']
+        if self.grouped():
+            self.use_product(self.product_model.item_id_at(selected_rows[0].row()))
+            return
         
-        reply = QMessageBox.question(self.window, "Confirm Removal", 
-                                    f"Remove {item_name} from inventory?",
-                                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        item_id = self.food_model.item_id_at(selected_rows[0].row())
+        item_data = self.food_items[item_id]
+        reason = self.ask_removal_reason(f"Remove {item_data['name']} from inventory?", item_data['expiry_date'])
+        if reason is not None:
+            self.remove_food_item(item_id, reason)
+
+    def use_product(self, product):
+        """Take an amount of a product from its earliest expiring lots"""
+        name, category = product
+        total = self.product_index.totals[product]
+        lots = len(self.product_index.lots[product])
+        quantity, ok = QInputDialog.getDouble(self.window, "Use Product",
+                                              f"How much {name} was used up? ({total} in {lots} lot(s))",
+                                              min(1, total), 0, total, 2)
+        if not ok or quantity <= 0:
+            return
         
-        if reply == QMessageBox.Yes:
-            self.remove_food_item(item_id)
+        first_lot = self.food_items[self.product_lots(name, category)[0]]
+        reason = self.ask_removal_reason(f"Take {quantity} {name} from inventory?", first_lot['expiry_date'])
+        if reason is not None:
+            self.consume_product(name, category, quantity, reason)
 
-    def generate_report(self, report_type="weekly"):
-        """Generate a report of food waste for the specified period"""
-        today = datetime.now().date()
+    def ask_removal_reason(self, question, expiry_date):
+        """Ask whether food was eaten or thrown away and return the history reason, or None if cancelled"""
+        confirm_box = QMessageBox(self.window)
+        confirm_box.setWindowTitle("Confirm Removal")
+        confirm_box.setText(f"{question}\nWas it eaten or thrown away?")
+        consumed_btn = confirm_box.addButton("Consumed", QMessageBox.AcceptRole)
+        discarded_btn = confirm_box.addButton("Thrown Away", QMessageBox.DestructiveRole)
+        confirm_box.addButton(QMessageBox.Cancel)
+        confirm_box.setDefaultButton(QMessageBox.Cancel)
+        confirm_box.exec_()
+        
+        if confirm_box.clickedButton() == consumed_btn:
+            return "consumed"
+        if confirm_box.clickedButton() == discarded_btn:
+            return "expired" if expiry_date < datetime.now().date() else "discarded"
+        return None
+
+    def transfer_progress(self, label):
+        """Return a progress dialog and a progress(done, total) callback that updates it"""
+        dialog = QProgressDialog(label, None, 0, 100, self.window)
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(500)
+        
+        def progress(done, total):
+            dialog.setValue(int(done * 100 / total) if total else 100)
+        return dialog, progress
+
+    def import_inventory(self):
+        """Merge a .jsonl or .csv file, such as a supplier manifest, into the inventory"""
+        path, _ = QFileDialog.getOpenFileName(self.window, "Import Inventory", "", TRANSFER_FILTER)
+        if not path:
+            return
         
-        if report_type == "weekly":
-            start_date = today - timedelta(days=7)
-            period_name = "Weekly"
-        else:  # monthly
-            start_date = today - timedelta(days=30)
-            period_name = "Monthly"
-        
-        # Find items that were in the inventory during this period
-        report_items = []
-        total_items = 0
-        expired_items = 0
-        consumed_items = 0
-        
-        # Process current inventory items
-        for item_id, item_data in self.food_items.items():
-            if item_data['purchase_date'] >= start_date:
-                total_items += 1
-                days_left = (item_data['expiry_date'] - today).days
-                
-                status = "Active"
-                if days_left < 0:
-                    status = "Expired"
-                    expired_items += 1
-                
-                report_items.append({
-                    'name': item_data['name'],
-                    'category': item_data['category'],
-                    'status': status,
-                    'purchase_date': item_data['purchase_date'].strftime('%Y-%m-%d'),
-                    'expiry_date': item_data['expiry_date'].strftime('%Y-%m-%d')
-                })
-        
-        # In a real application, we'd also check for items that were removed from inventory
-        # during this period (e.g., consumed or discarded). For this demo, we'll simulate
-        # some consumed items.
-        
-        # Simulate some consumed items (in a real app, this would come from tracking removals)
-        if report_type == "weekly":
-            consumed_items = random.randint(3, 8)  # Simulate 3-8 consumed items per week
-        else:
-            consumed_items = random.randint(12, 25)  # Simulate 12-25 consumed items per month
+        dialog, progress = self.transfer_progress("Importing items...")
+        try:
+            count = self.import_items(path, progress)
+        except Exception as e:
+            QMessageBox.critical(self.window, "Import Error", f"Could not import {path}: {e}")
+            return
+        finally:
+            dialog.close()
+        QMessageBox.information(self.window, "Import Complete", f"Imported {count} items.")
+
+    def export_inventory(self):
+        """Write the inventory to a .jsonl or .csv file"""
+        path, selected_filter = QFileDialog.getSaveFileName(self.window, "Export Inventory", "", TRANSFER_FILTER)
+        if not path:
+            return
+        if Path(path).suffix.lower() not in FORMATS:
+            path += ".jsonl" if "jsonl" in selected_filter else ".csv"
         
-        # Calculate waste percentage
-        if total_items + consumed_items > 0:
-            waste_percentage = (expired_items / (total_items + consumed_items)) * 100
-        else:
-            waste_percentage = 0
-        
-        report_data = {
-            'start_date': start_date.strftime('%Y-%m-%d'),
-            'end_date': today.strftime('%Y-%m-%d'),
-            'total_items': total_items + consumed_items,  # Total items in period
-            'expired_items': expired_items,               # Items that expired
-            'consumed_items': consumed_items,             # Items that were consumed
-            'waste_percentage': waste_percentage,         # Percentage of waste
-            'items': report_items                         # List of items in the report
-        }
+        dialog, progress = self.transfer_progress("Exporting items...")
+        try:
+            self.export_items(path, progress)
+        except Exception as e:
+            QMessageBox.critical(self.window, "Export Error", f"Could not export to {path}: {e}")
+            return
+        finally:
+            dialog.close()
+        QMessageBox.information(self.window, "Export Complete", f"Exported {len(self.food_items)} items to {path}.")
+
+    def generate_report(self, report_type="weekly"):
+        """Generate a report of food waste for the specified period"""
+        report_data = self.compute_report(report_type)
         
         # Show the report dialog
         report_dialog = ReportDialog(self.window, report_data, report_type)
         report_dialog.exec_()
-    
+
     def run(self):
         """Run the application"""
         self.window.show()
     
-        # Show expiring items notification on startup
-        QTimer.singleShot(500, self.show_startup_notification)
+        # Show expiring items notification on startup, as soon as the inventory is in
+        self.running = True
+        if self.loaded:
+            self.show_startup_notification()
     
-        return self.app.exec_()
+        result = self.app.exec_()
+        self.close()
+        return result
 
     def show_startup_notification(self):
         """Show notification about expiring products on startup"""
@@ -497,7 +561,11 @@
             expiring_items = self.get_expiring_soon()
             if expiring_items:
                 startup_dialog = StartupExpiryDialog(self.window, self, expiring_items)
-            startup_dialog.exec_()
+                startup_dialog.exec_()
         except Exception as e:
             print(f"Error in startup notification: {e}")
         # Don't let errors here crash the whole application
+
+
+if __name__ == "__main__":
+    raise SystemExit(FoodWasteLogger().run())
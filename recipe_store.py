@@ -0,0 +1,95 @@
+"""Recipe libraries for the Food Waste Logger
+
+Only the name and ingredient list of each recipe stay in memory for
+matching. The instructions are read from the library when a recipe is
+actually opened.
+"""
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+
+def recipe_summary(recipe_id, name, ingredients):
+    """Build the resident part of a recipe, sharing repeated ingredient strings"""
+    return {
+        "id": recipe_id,
+        "name": name,
+        "ingredients": [sys.intern(ingredient) for ingredient in ingredients]
+    }
+
+
+class BuiltinRecipeStore:
+    """Recipes held entirely in memory, used when no library file exists"""
+
+    def __init__(self, recipes):
+        self.recipes = recipes
+
+    def full_recipe(self, recipe):
+        return recipe
+
+    def close(self):
+        pass
+
+
+class JsonLinesRecipeStore:
+    """Recipe library stored as one JSON object per line
+
+    The file is streamed once at startup, remembering the byte offset of each
+    line so the instructions can be read back with a single seek.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.recipes = []
+        offset = 0
+        with open(self.path, 'rb') as file:
+            for line in file:
+                if line.strip():
+                    recipe = json.loads(line)
+                    self.recipes.append(recipe_summary(offset, recipe['name'], recipe['ingredients']))
+                offset += len(line)
+
+    def full_recipe(self, recipe):
+        """Return the recipe with its instructions read from the library"""
+        with open(self.path, 'rb') as file:
+            file.seek(recipe['id'])
+            stored = json.loads(file.readline())
+        return dict(recipe, instructions=stored.get('instructions', ""))
+
+    def close(self):
+        pass
+
+
+class SqliteRecipeStore:
+    """Recipe library stored in an SQLite database
+
+    Expected table: recipes (id INTEGER PRIMARY KEY, name TEXT,
+    ingredients TEXT holding a JSON list, instructions TEXT).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        # Opened by the GUI's loader thread but read from the GUI thread afterwards
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.recipes = [recipe_summary(recipe_id, name, json.loads(ingredients))
+                        for recipe_id, name, ingredients
+                        in self.conn.execute("SELECT id, name, ingredients FROM recipes ORDER BY id")]
+
+    def full_recipe(self, recipe):
+        """Return the recipe with its instructions read from the library"""
+        row = self.conn.execute("SELECT instructions FROM recipes WHERE id = ?", (recipe['id'],)).fetchone()
+        return dict(recipe, instructions=row[0] if row else "")
+
+    def close(self):
+        self.conn.close()
+
+
+def open_recipe_store(app_dir, default_recipes):
+    """Open recipes.jsonl or recipes.db from app_dir, or fall back to the built-in recipes"""
+    app_dir = Path(app_dir)
+    if (app_dir / "recipes.jsonl").exists():
+        return JsonLinesRecipeStore(app_dir / "recipes.jsonl")
+    if (app_dir / "recipes.db").exists():
+        return SqliteRecipeStore(app_dir / "recipes.db")
+    return BuiltinRecipeStore(default_recipes)
@@ -0,0 +1,158 @@
+"""Load test for inventory_service.py
+
+Starts a service on a free port with a throwaway data directory (or uses
+--url), then drives it from many concurrent keep-alive connections with a
+mix of adds, removals, expiry checks, recipe suggestions and reports, and
+prints latency percentiles and throughput per endpoint as JSON.
+
+    python service_loadtest.py --clients 50 --requests 200 --storage sqlite
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from benchmark import CATEGORIES, FOODS, VARIETIES
+
+# (endpoint name, share of the requests)
+MIX = [("add", 0.4), ("remove", 0.1), ("expiring", 0.2), ("recipes", 0.2), ("report", 0.1)]
+
+
+async def request(reader, writer, method, target, payload=None):
+    """Send one request on a keep-alive connection and return (status, JSON body)"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, count, rng, item_ids, latencies, errors):
+    """Issue count requests from one connection"""
+    reader, writer = await asyncio.open_connection(host, port)
+    today = datetime.now().date()
+    names, weights = zip(*MIX)
+    try:
+        for _ in range(count):
+            name = rng.choices(names, weights)[0]
+            if name == "remove" and not item_ids:
+                name = "add"
+
+            if name == "add":
+                purchase_date = today - timedelta(days=rng.randint(0, 10))
+                args = ("POST", "/items", {
+                    "name": f"{rng.choice(VARIETIES)}{rng.choice(FOODS)}",
+                    "category": rng.choice(CATEGORIES),
+                    "quantity": rng.randint(1, 5),
+                    "purchase_date": purchase_date.isoformat(),
+                    "expiry_date": (purchase_date + timedelta(days=rng.randint(1, 20))).isoformat()
+                })
+            elif name == "remove":
+                item_id = item_ids.pop(rng.randrange(len(item_ids)))
+                args = ("DELETE", f"/items/{item_id}?reason={rng.choice(['consumed', 'discarded'])}")
+            elif name == "expiring":
+                args = ("GET", "/expiring?days=3")
+            elif name == "recipes":
+                args = ("GET", f"/recipes?ingredient={rng.choice(FOODS)}&ingredient={rng.choice(FOODS)}")
+            else:
+                args = ("GET", f"/report?type={rng.choice(['weekly', 'monthly'])}")
+
+            start = time.perf_counter()
+            status, body = await request(reader, writer, *args)
+            latencies[name].append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(f"{args[0]} {args[1]}: {status} {body.get('error')}")
+            elif name == "add":
+                item_ids.append(body["id"])
+    finally:
+        writer.close()
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"calls": 0}
+    return {
+        "calls": len(latencies),
+        "throughput_per_s": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    }
+
+
+async def run_load(host, port, clients, requests, seed):
+    rng = random.Random(seed)
+    latencies = {name: [] for name, _ in MIX}
+    errors = []
+    item_ids = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, requests, random.Random(rng.random()), item_ids, latencies, errors)
+                           for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    results = {name: summarize(values, elapsed) for name, values in latencies.items()}
+    results["all"] = summarize([value for values in latencies.values() for value in values], elapsed)
+    return {"elapsed_s": elapsed, "errors": len(errors), "first_errors": errors[:5], "results": results}
+
+
+def start_service(storage_mode, app_dir):
+    """Start inventory_service.py on a free port and return (process, port)"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inventory_service.py")
+    process = subprocess.Popen([sys.executable, script, "--port", "0", "--storage", storage_mode,
+                                "--app-dir", app_dir], stdout=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        if line.startswith("Serving on "):
+            # Keep reading its output so the service never blocks on a full pipe
+            threading.Thread(target=process.stdout.read, daemon=True).start()
+            return process, urlsplit(line.split()[-1]).port
+    raise RuntimeError("The service exited before it started serving")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="drive a running service instead of starting one")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=200, help="requests per connection")
+    parser.add_argument("--storage", default="json", choices=["json", "journal", "sqlite"])
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as app_dir:
+        process = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port
+        else:
+            process, port = start_service(args.storage, app_dir)
+            host = "127.0.0.1"
+        try:
+            report = asyncio.run(run_load(host, port, args.clients, args.requests, args.seed))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    report.update(clients=args.clients, requests_per_client=args.requests, storage_mode=args.storage)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Tests for the in-memory inventory indexes
+
+    python -m unittest test_food_index
+"""
+import unittest
+
+from food_index import SearchIndex
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add("a", "Milk", "Dairy")
+        self.index.add("b", "Oat milk", "Dairy")
+        self.index.add("c", "Minced beef", "Meat")
+
+    def test_typing_narrows_the_last_matches(self):
+        self.assertEqual(self.index.search("mil"), {"a", "b"})
+        self.assertEqual(self.index.search("milk"), {"a", "b"})
+        self.assertEqual(self.index.search("milk d"), {"a", "b"})
+        self.assertEqual(self.index.search("milk da"), {"a", "b"})
+        self.assertEqual(self.index.search("oat"), {"b"})
+
+    def test_items_added_while_typing_are_found(self):
+        self.assertEqual(self.index.search("mil"), {"a", "b"})
+        # Same text as an indexed item, then a text the index has not seen
+        self.index.add("d", "Milk", "Dairy")
+        self.index.add("e", "Milkshake", "Drinks")
+        self.assertEqual(self.index.search("milk"), {"a", "b", "d", "e"})
+
+    def test_discarded_items_are_dropped_while_typing(self):
+        self.assertEqual(self.index.search("mil"), {"a", "b"})
+        self.index.discard("b")
+        self.assertEqual(self.index.search("milk"), {"a"})
+        self.index.discard("a")
+        self.assertEqual(self.index.search("milk "), set())
+
+    def test_renamed_item_moves_to_its_new_text(self):
+        self.assertEqual(self.index.search("min"), {"c"})
+        self.index.add("c", "Ground beef", "Meat")
+        self.assertEqual(self.index.search("minc"), set())
+        self.assertEqual(self.index.search("beef"), {"c"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Tests for the inventory storage backends
+
+    python -m unittest test_food_storage
+"""
+import json
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+
+from food_item import FoodItem
+from food_storage import JournalStore
+
+
+def make_item(name):
+    today = date.today()
+    return FoodItem(name, "Dairy", 1.0, today, today + timedelta(days=7))
+
+
+class JournalStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_file = Path(self.temp_dir.name) / "food_inventory.json"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def reopen(self, **kwargs):
+        store = JournalStore(self.snapshot_file, **kwargs)
+        self.addCleanup(store.close)
+        return store, store.load()
+
+    def test_append_after_a_torn_write_is_kept(self):
+        store, _ = self.reopen()
+        store.apply([("add", "a", make_item("a"))], None)
+        store.close()
+        # A crash in the middle of writing the next record
+        with open(store.journal_file, 'ab') as file:
+            file.write(b'{"op": "add", "id": "b", "it')
+
+        store, items = self.reopen()
+        self.assertEqual(sorted(items), ["a"])
+        store.apply([("add", "c", make_item("c"))], None)
+        store.close()
+
+        store, items = self.reopen()
+        self.assertEqual(sorted(items), ["a", "c"])
+
+    def test_compaction_after_a_torn_write_keeps_later_records(self):
+        store, _ = self.reopen()
+        store.apply([("add", "a", make_item("a"))], None)
+        store.close()
+        with open(store.journal_file, 'ab') as file:
+            file.write(b'{"op": "remo')
+
+        store, _ = self.reopen(compact_threshold=3)
+        store.apply([("add", "c", make_item("c")), ("add", "d", make_item("d"))], None)
+        store.wait_for_compaction()
+        self.assertFalse(store.rotated_file.exists())
+        store.close()
+
+        store, items = self.reopen()
+        self.assertEqual(sorted(items), ["a", "c", "d"])
+
+    def test_unreadable_record_is_skipped(self):
+        records = [json.dumps({"op": "add", "id": "a", "item": make_item("a").to_record()}), "not json",
+                   json.dumps({"op": "remove", "id": "a"})]
+        self.snapshot_file.with_suffix('.journal').write_text("\n".join(records) + "\n")
+        _, items = self.reopen()
+        self.assertEqual(items, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
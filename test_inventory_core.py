@@ -0,0 +1,84 @@
+"""Tests for the inventory operations shared by the GUI and the service
+
+    python -m unittest test_inventory_core
+"""
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from food_item import FoodItem
+from inventory_core import InventoryCore
+
+
+class ConsumeProductTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.core = InventoryCore("json", self.temp_dir.name)
+        self.today = date.today()
+
+    def tearDown(self):
+        self.core.close()
+        self.temp_dir.cleanup()
+
+    def add_lot(self, quantity, days_left):
+        return self.core.add_food_item("Milk", "Dairy", quantity, self.today,
+                                       self.today + timedelta(days=days_left))
+
+    def test_earliest_expiring_lots_are_used_first(self):
+        late = self.add_lot(2.0, 6)
+        early = self.add_lot(1.0, 2)
+        middle = self.add_lot(2.0, 4)
+
+        self.assertEqual(self.core.consume_product("Milk", "Dairy", 2.0), 2.0)
+        self.assertNotIn(early, self.core.food_items)
+        self.assertEqual(self.core.food_items[middle].quantity, 1.0)
+        self.assertEqual(self.core.food_items[late].quantity, 2.0)
+        self.assertEqual(self.core.product_lots("Milk", "Dairy"), [middle, late])
+
+    def test_running_out_returns_what_was_taken(self):
+        self.add_lot(1.0, 2)
+        self.add_lot(0.5, 3)
+
+        self.assertEqual(self.core.consume_product("Milk", "Dairy", 4.0), 1.5)
+        self.assertEqual(self.core.product_lots("Milk", "Dairy"), [])
+
+    def test_partly_used_lot_is_counted_once(self):
+        self.add_lot(1.0, 2)
+        self.add_lot(1.0, 4)
+        self.add_lot(1.0, 6)
+
+        self.core.consume_product("Milk", "Dairy", 1.5)
+        totals = self.core.history.totals(self.today, self.today)
+        self.assertEqual((totals['consumed'], totals['used']), (1, 1))
+
+        report = self.core.compute_report(start_date=self.today, end_date=self.today)
+        self.assertEqual(report['total_items'], 3)
+        self.assertEqual(report['consumed_items'], 1)
+        self.assertEqual(len(report['items']), 2)
+
+
+class MergeItemsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.core = InventoryCore("json", self.temp_dir.name)
+        self.today = date.today()
+
+    def tearDown(self):
+        self.core.close()
+        self.temp_dir.cleanup()
+
+    def test_new_items_are_recorded_as_added(self):
+        item_id = self.core.add_food_item("Milk", "Dairy", 1.0)
+        expiry = self.today + timedelta(days=5)
+        self.core.merge_items([(item_id, FoodItem("Milk", "Dairy", 2.0, self.today, expiry)),
+                               ("legacy1700000000", FoodItem("Bread", "Bakery", 1.0, self.today, expiry)),
+                               (None, FoodItem("Eggs", "Dairy", 6.0, self.today, expiry))])
+
+        self.assertEqual(len(self.core.food_items), 3)
+        self.assertEqual(self.core.history.totals(self.today, self.today)['added'], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
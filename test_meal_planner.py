@@ -0,0 +1,52 @@
+"""Tests for the meal planner's greedy cover
+
+    python -m unittest test_meal_planner
+"""
+import unittest
+
+from food_index import RecipeIndex
+from meal_planner import plan_meals
+
+RECIPES = [
+    {'name': "Omelet", 'ingredients': ["Eggs", "Milk"]},
+    {'name': "Smoothie", 'ingredients': ["Milk", "Banana"]},
+    {'name': "Salad", 'ingredients': ["Spinach"]},
+]
+
+
+def summary(plan):
+    return [(meal['day'], meal['recipe']['name'], meal['uses'], meal['quantity']) for meal in plan]
+
+
+class PlanMealsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.recipe_index = RecipeIndex(RECIPES)
+
+    def test_greedy_plan(self):
+        # Weights: eggs 6 / 1 = 6 on day 0 only, milk 2 / 2 = 1 and spinach 1 / 3 on days 0 and 1.
+        # Day 0 the omelet covers 7, day 1 the smoothie has nothing left, and on day 2
+        # nothing is still good, so the plan stops after two meals
+        products = [("Eggs", "Dairy", 6, 0), ("Milk", "Dairy", 2, 1), ("Spinach", "Vegetables", 1, 2)]
+        self.assertEqual(summary(plan_meals(products, self.recipe_index, days=3)),
+                         [(0, "Omelet", ["Eggs", "Milk"], 8), (1, "Salad", ["Spinach"], 1)])
+
+    def test_lots_of_a_product_are_covered_while_still_good(self):
+        # The eggs lot expiring today outweighs the spinach on day 0 and goes
+        # with the omelet; the later lot is used by the same meal
+        products = [("Eggs", "Dairy", 6, 0), ("Eggs", "Dairy", 2, 1), ("Spinach", "Vegetables", 1, 1)]
+        self.assertEqual(summary(plan_meals(products, self.recipe_index, days=2)),
+                         [(0, "Omelet", ["Eggs"], 8), (1, "Salad", ["Spinach"], 1)])
+
+    def test_expired_lots_are_left_out_of_later_meals(self):
+        # Spinach weighs most on day 0; by day 1 only the eggs lot good for two more days is left
+        products = [("Spinach", "Vegetables", 4, 0), ("Eggs", "Dairy", 1, 0), ("Eggs", "Dairy", 3, 2)]
+        self.assertEqual(summary(plan_meals(products, self.recipe_index, days=2)),
+                         [(0, "Salad", ["Spinach"], 4), (1, "Omelet", ["Eggs"], 3)])
+
+    def test_no_days_plans_nothing(self):
+        self.assertEqual(plan_meals([("Eggs", "Dairy", 6, 0)], self.recipe_index, days=0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Regression tests for several loggers sharing one data directory
+
+    python -m unittest test_shared_storage
+"""
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+from inventory_core import InventoryCore
+
+HERE = Path(__file__).resolve().parent
+
+# Another logger process: adds argv[4] items named argv[2] to the inventory in argv[1] and exits
+ADD_ITEMS = """
+import sys
+from inventory_core import InventoryCore
+core = InventoryCore("json", sys.argv[1])
+for _ in range(int(sys.argv[4])):
+    core.add_food_item(sys.argv[2], sys.argv[3], 1.0)
+core.close()
+"""
+
+
+def start_logger(app_dir, name, category="Dairy", count=1):
+    return subprocess.Popen([sys.executable, "-c", ADD_ITEMS, app_dir, name, category, str(count)], cwd=HERE,
+                            stdout=subprocess.DEVNULL)
+
+
+def add_in_other_process(app_dir, name, category="Dairy"):
+    if start_logger(app_dir, name, category).wait() != 0:
+        raise RuntimeError("The other logger failed")
+
+
+class SharedJsonStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def names(self, core):
+        return sorted(item.name for item in core.food_items.values())
+
+    def test_items_merged_by_our_save_are_reloaded(self):
+        core = InventoryCore("json", self.app_dir)
+        try:
+            add_in_other_process(self.app_dir, "FromB")
+            # Our save lands on top of the other logger's file, picking its item up
+            core.add_food_item("FromA", "Dairy", 1.0)
+            core.persistence.flush()
+            self.assertEqual(len(core.reload_changes()), 1)
+            self.assertEqual(self.names(core), ["FromA", "FromB"])
+            self.assertEqual(core.reload_changes(), [])
+        finally:
+            core.close()
+
+    def test_own_saves_are_not_external_changes(self):
+        core = InventoryCore("json", self.app_dir)
+        try:
+            core.add_food_item("Mine", "Dairy", 1.0)
+            core.persistence.flush()
+            # reload_changes() only waits on the persistence thread after a change elsewhere
+            self.assertFalse(core.storage.changed_externally())
+        finally:
+            core.close()
+
+
+class SharedHistoryTest(unittest.TestCase):
+
+    def test_concurrent_loggers_keep_the_history_readable(self):
+        categories = ["Dairy", "Vegetables", "Meat", "Fruits"]
+        with tempfile.TemporaryDirectory() as app_dir:
+            loggers = [start_logger(app_dir, category, category, 50) for category in categories]
+            self.assertEqual([logger.wait() for logger in loggers], [0] * len(categories))
+
+            core = InventoryCore("json", app_dir)
+            try:
+                today = date.today()
+                for category in categories:
+                    self.assertEqual(core.history.totals(today, today, category)["added"], 50)
+                self.assertEqual(len(core.food_items), 50 * len(categories))
+            finally:
+                core.close()
+
+
+if __name__ == "__main__":
+    unittest.main()